@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'duration',
+        'worker',
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('started', 'finished', 'duration', 'error')
@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import sqlite
+        connection_created.connect(sqlite.configure)
+        request_started.connect(sqlite.check_connections)
+        if settings.TEMPLATE_TIMING:
+            from . import templating
+            templating.instrument()
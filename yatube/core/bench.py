@@ -0,0 +1,123 @@
+import json
+import math
+import time
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+from .queries import log_queries
+
+APPS = ('posts', 'users', 'about')
+# Рост p95 меньше этого числа миллисекунд считается шумом.
+MIN_DELTA_MS = 1.0
+
+
+def named_urls(apps=APPS):
+    """Пары (имя URL, имена его аргументов) из urls.py приложений."""
+    for app in apps:
+        module = import_module(f'{app}.urls')
+        for pattern in module.urlpatterns:
+            if pattern.name:
+                yield (f'{module.app_name}:{pattern.name}',
+                       list(pattern.pattern.regex.groupindex))
+
+
+def samples():
+    """Значения аргументов URL: самые тяжелые страницы набора данных."""
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    author = User.objects.order_by('-stats__followers_count', 'pk').first()
+    group = Group.objects.order_by('pk').first()
+    return {
+        'post_id': post and post.pk,
+        'username': author and author.username,
+        'slug': group and group.slug,
+        'query': post and post.text.split()[0],
+    }
+
+
+def urls(values, skip=()):
+    """Пары (имя, путь); URL без значений аргументов пропускаются."""
+    for name, args in named_urls():
+        if name in skip or any(values.get(arg) is None for arg in args):
+            continue
+        path = reverse(name, kwargs={arg: values[arg] for arg in args})
+        if name == 'posts:search':
+            path += '?' + urlencode({'q': values['query']})
+        yield name, path
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    values = sorted(values)
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank - 1, 0)]
+
+
+def client(user=None):
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def measure(client, path, repeat, cold=False):
+    """Время (мс), запросы и размер ответа за repeat прогонов после
+    одного прогревочного."""
+    client.get(path)
+    timings, queries = [], []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with log_queries(settings.QUERY_BUDGET_IGNORE_TABLES) as log:
+            start = time.perf_counter()
+            response = client.get(path)
+            body = (b''.join(response.streaming_content)
+                    if response.streaming else response.content)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(log.count)
+    return {
+        'status': response.status_code,
+        'p50': round(percentile(timings, 50), 3),
+        'p95': round(percentile(timings, 95), 3),
+        'queries': max(queries),
+        'bytes': len(body),
+    }
+
+
+def regressions(baseline, results, threshold):
+    """Сообщения о вьюхах, ставших медленнее базовых замеров."""
+    found = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if (current['p95'] > base['p95'] * (1 + threshold)
+                and current['p95'] - base['p95'] >= MIN_DELTA_MS):
+            found.append(
+                f'{key}: p95 {base["p95"]:.1f} -> {current["p95"]:.1f} мс'
+            )
+        if current['queries'] > base['queries']:
+            found.append(
+                f'{key}: запросов {base["queries"]} -> {current["queries"]}'
+            )
+    return found
+
+
+def load(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def save(path, results):
+    with open(path, 'w') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2,
+                  sort_keys=True)
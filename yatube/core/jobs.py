@@ -0,0 +1,144 @@
+import json
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger('core.jobs')
+
+RETRY_DELAY = settings.JOB_RETRY_DELAY
+STALE_AFTER = settings.JOB_STALE_AFTER
+
+
+def job(max_attempts=3, unique=False):
+    """Делает функцию задачей: func.delay(...) ставит вызов в очередь.
+
+    Функция должна лежать на уровне модуля, а аргументы - сводиться
+    к JSON. Задача создается в текущей транзакции, поэтому при ее
+    откате в очередь ничего не попадает. С unique=True вызов с теми же
+    аргументами, уже ждущий или выполняемый, повторно не ставится.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def delay(*args, **kwargs):
+            return enqueue(name, args, kwargs, max_attempts=max_attempts,
+                           unique=unique)
+
+        func.job_name = name
+        func.delay = delay
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=3, run_at=None,
+            unique=False):
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+    if unique:
+        pending = Job.objects.filter(
+            name=name, payload=payload, status__in=(Job.QUEUED, Job.RUNNING)
+        ).first()
+        if pending is not None:
+            return pending
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def claim(worker):
+    """Забирает одну готовую задачу; None, если очередь пуста.
+
+    Задача захватывается условным UPDATE: из нескольких обработчиков,
+    выбравших одну строку, ее получит только тот, чье обновление
+    затронуло строку, остальные возьмут следующую.
+    """
+    while True:
+        now = timezone.now()
+        pk = Job.objects.filter(
+            status=Job.QUEUED, run_at__lte=now
+        ).order_by('run_at', 'id').values_list('id', flat=True).first()
+        if pk is None:
+            return None
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            started=now,
+            worker=worker,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+
+def backoff(attempts):
+    """Задержка перед повтором: экспонента с разбросом."""
+    delay = RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+def run(job):
+    """Выполняет захваченную задачу и записывает результат и время."""
+    start = time.perf_counter()
+    try:
+        func = import_string(job.name)
+        payload = json.loads(job.payload)
+        func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + backoff(job.attempts)
+        else:
+            job.status = Job.FAILED
+        logger.exception('Задача %s #%s упала (попытка %d)',
+                         job.name, job.pk, job.attempts)
+    else:
+        job.status = Job.DONE
+        job.error = ''
+    job.finished = timezone.now()
+    job.duration = time.perf_counter() - start
+    job.save(update_fields=[
+        'status', 'run_at', 'finished', 'duration', 'error'
+    ])
+    logger.info('Задача %s #%s: %s за %.3f с', job.name, job.pk,
+                job.status, job.duration)
+    return job
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """Возвращает в очередь задачи, чей обработчик, видимо, умер."""
+    deadline = timezone.now() - timedelta(seconds=stale_after)
+    return Job.objects.filter(
+        status=Job.RUNNING, started__lt=deadline
+    ).update(status=Job.QUEUED, run_at=timezone.now())
+
+
+def work(worker, stop, poll_interval=1.0, burst=False):
+    """Цикл обработчика: берет задачи, пока не выставлен stop.
+
+    В режиме burst выходит, как только очередь опустела.
+    Возвращает число выполненных задач.
+    """
+    done = 0
+    while not stop.is_set():
+        job = claim(worker)
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run(job)
+        done += 1
+    return done
@@ -0,0 +1,342 @@
+import io
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from importlib import import_module
+from random import Random
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.db import connection
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .bench import percentile
+
+# Границы корзин гистограммы задержек, мс; последняя корзина - все, что
+# дольше. Корзины фиксированы, чтобы прогоны можно было сравнивать.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+DEFAULT_MIX = 'browse=70,profile=15,comment=10,follow=5'
+
+
+class WSGITransport:
+    """Вызывает WSGI-приложение в том же процессе, без сети."""
+
+    def __init__(self, application, host=None):
+        self.application = application
+        self.host = host or settings.ALLOWED_HOSTS[0]
+
+    def request(self, method, path, headers, body=b''):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            if key != 'CONTENT_TYPE':
+                key = f'HTTP_{key}'
+            environ[key] = value
+        started = []
+
+        def start_response(status, response_headers, exc_info=None):
+            started[:] = [int(status.split()[0]), response_headers]
+
+        result = self.application(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return started[0], started[1], content
+
+
+class HTTPTransport:
+    """Ходит на запущенный сервер; у каждого потока свое соединение."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method, path, headers, body=b''):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = HTTPConnection(self.host, self.port)
+        try:
+            conn.request(method, self.prefix + path, body=body,
+                         headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+        except Exception:
+            conn.close()
+            self.local.conn = None
+            raise
+        return response.status, response.getheaders(), content
+
+
+class Target:
+    """Что есть в базе: посты, авторы и пользователи для входа."""
+
+    def __init__(self, sample=1000):
+        posts = Post.objects.order_by('-pk')[:sample]
+        self.posts = list(posts.values_list('pk', flat=True))
+        self.authors = sorted(set(
+            posts.values_list('author__username', flat=True)
+        ))
+        self.users = list(
+            User.objects.filter(is_active=True).order_by('pk')
+            .values_list('pk', flat=True)[:sample]
+        )
+        if not self.posts or not self.users:
+            raise ValueError('В базе нет постов или пользователей')
+
+
+class Session:
+    """Виртуальный пользователь: куки, CSRF и запись замеров."""
+
+    def __init__(self, transport, target, user_id, rnd, samples):
+        self.transport = transport
+        self.target = target
+        self.user_id = user_id
+        self.rnd = rnd
+        self.samples = samples
+        self.cookies = {}
+
+    def login(self):
+        """Входит как свой пользователь, минуя форму (как force_login)."""
+        if settings.SESSION_COOKIE_NAME in self.cookies:
+            return
+        user = User.objects.get(pk=self.user_id)
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+        self.cookies[settings.SESSION_COOKIE_NAME] = store.session_key
+
+    def get(self, name, *args, query=''):
+        path = reverse(name, args=args) + (f'?{query}' if query else '')
+        return self.request(f'GET {name}', 'GET', path)
+
+    def post(self, name, *args, data):
+        return self.request(f'POST {name}', 'POST', reverse(name, args=args),
+                            urlencode(data).encode())
+
+    def request(self, label, method, path, body=b''):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{key}={value}' for key, value in self.cookies.items()
+            )
+        if method == 'POST':
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get(
+                settings.CSRF_COOKIE_NAME, ''
+            )
+        start = time.perf_counter()
+        try:
+            status, response_headers, content = self.transport.request(
+                method, path, headers, body
+            )
+        except Exception:
+            status, response_headers, content = None, [], b''
+        self.samples[label].append((time.perf_counter() - start, status))
+        for name, value in response_headers:
+            if name.lower() == 'set-cookie':
+                for key, morsel in SimpleCookie(value).items():
+                    self.cookies[key] = morsel.value
+        return status, content
+
+
+def browse(session):
+    post = session.rnd.choice(session.target.posts)
+    session.get('posts:index')
+    session.get('posts:post_detail', post)
+    session.get('posts:comments', post)
+
+
+def profile(session):
+    author = session.rnd.choice(session.target.authors)
+    session.get('posts:profile', author)
+    session.get('posts:search', query=f'q={author[:3]}')
+
+
+def comment(session):
+    session.login()
+    post = session.rnd.choice(session.target.posts)
+    # Страница поста выдает CSRF-куку для формы комментария.
+    session.get('posts:post_detail', post)
+    text = f'Нагрузочный комментарий {session.rnd.random()}'
+    session.post('posts:add_comment', post, data={'text': text})
+
+
+def follow(session):
+    session.login()
+    author = session.rnd.choice(session.target.authors)
+    session.get('posts:profile_follow', author)
+    session.get('posts:follow_index')
+    session.get('posts:profile_unfollow', author)
+
+
+SCENARIOS = {
+    'browse': browse,
+    'profile': profile,
+    'comment': comment,
+    'follow': follow,
+}
+
+
+def parse_mix(mix, scenarios):
+    """'browse=70,comment=10' -> ([имена], [веса])."""
+    names, weights = [], []
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in scenarios:
+            raise ValueError(f'Неизвестный сценарий: {name}')
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def worker(transport, target, scenarios, mix, number, seed, deadline,
+           iterations):
+    """Поток одного виртуального пользователя; вернет его замеры."""
+    rnd = Random(seed * 1000003 + number)
+    samples = defaultdict(list)
+    session = Session(transport, target,
+                      target.users[number % len(target.users)], rnd, samples)
+    names, weights = mix
+    done = 0
+    try:
+        while (done < iterations if iterations
+               else time.monotonic() < deadline):
+            name = rnd.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                scenarios[name](session)
+                status = 'ok'
+            except Exception:
+                status = None
+            samples[f'scenario {name}'].append(
+                (time.perf_counter() - start, status)
+            )
+            done += 1
+    finally:
+        connection.close()
+    return samples
+
+
+def run(transport, target, scenarios, mix, threads, duration=None,
+        iterations=None, seed=0, offset=0):
+    """Гоняет threads потоков; вернет замеры {метка: [(с, статус)]}."""
+    deadline = time.monotonic() + (duration or 0)
+    results = [None] * threads
+
+    def target_thread(index):
+        results[index] = worker(transport, target, scenarios, mix,
+                                offset + index, seed, deadline, iterations)
+
+    pool = [threading.Thread(target=target_thread, args=(index,))
+            for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return merge(results)
+
+
+def merge(results):
+    merged = defaultdict(list)
+    for samples in results:
+        for label, values in samples.items():
+            merged[label].extend(values)
+    return dict(merged)
+
+
+def is_error(status):
+    """Ошибка - нет ответа, упавший сценарий или статус 4xx/5xx."""
+    return status is None or (status != 'ok' and status >= 400)
+
+
+def histogram(timings):
+    counts = [0] * (len(BUCKETS) + 1)
+    for value in timings:
+        counts[next((index for index, bound in enumerate(BUCKETS)
+                     if value <= bound), len(BUCKETS))] += 1
+    return counts
+
+
+def stats(values, elapsed):
+    timings = [seconds * 1000 for seconds, _ in values]
+    errors = sum(is_error(status) for _, status in values)
+    return {
+        'count': len(values),
+        'rps': round(len(values) / elapsed, 2),
+        'errors': errors,
+        'error_rate': round(errors / len(values), 4),
+        'statuses': dict(Counter(str(status) for _, status in values)),
+        'p50': round(percentile(timings, 50), 3),
+        'p95': round(percentile(timings, 95), 3),
+        'p99': round(percentile(timings, 99), 3),
+        'max': round(max(timings), 3),
+        'histogram': histogram(timings),
+    }
+
+
+def summarize(samples, elapsed):
+    """Сводка прогона: по каждой метке и по всем HTTP-запросам вместе."""
+    requests = [value for label, values in samples.items()
+                if not label.startswith('scenario ')
+                for value in values]
+    return {
+        'elapsed': round(elapsed, 3),
+        'buckets': list(BUCKETS),
+        'total': stats(requests, elapsed) if requests else None,
+        'labels': {label: stats(values, elapsed)
+                   for label, values in sorted(samples.items())},
+    }
+
+
+def render_histogram(counts, width=40):
+    top = max(counts) or 1
+    bounds = [f'<= {bound} мс' for bound in BUCKETS]
+    bounds.append(f'>  {BUCKETS[-1]} мс')
+    for bound, count in zip(bounds, counts):
+        bar = '#' * round(width * count / top)
+        yield f'{bound:>12} {bar:<{width}} {count}'
+
+
+def compare(old, new):
+    """Строки с изменениями rps, p95 и доли ошибок относительно old."""
+    for label, current in new['labels'].items():
+        base = old['labels'].get(label)
+        if base is None:
+            continue
+        yield (
+            f'{label}: rps {base["rps"]} -> {current["rps"]}, '
+            f'p95 {base["p95"]} -> {current["p95"]} мс, '
+            f'ошибки {base["error_rate"]:.2%} -> {current["error_rate"]:.2%}'
+        )
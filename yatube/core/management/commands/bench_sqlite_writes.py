@@ -0,0 +1,135 @@
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import sqlite
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_author ON post (author_id, pub_date)',
+)
+# Настройки Django по умолчанию: журнал отката, synchronous=full
+# и ожидание блокировки из timeout соединения, без повторов.
+MODES = (
+    ('default', {}, False),
+    ('tuned', settings.SQLITE_PRAGMAS, True),
+)
+
+
+def write(path, pragmas, retry, transactions, rows, seed):
+    """Писатель: транзакции как у вьюх - чтение, затем вставка.
+
+    Возвращает пару (успешных транзакций, упавших на блокировке).
+    """
+    # Повторы здесь считаются, а не пишутся в журнал.
+    logging.getLogger('core.sqlite').setLevel(logging.ERROR)
+    rnd = random.Random(seed)
+    db = sqlite3.connect(path, isolation_level=None)
+    for statement in sqlite.pragma_statements(pragmas):
+        db.execute(statement)
+
+    def transaction():
+        author = rnd.randrange(100)
+        db.execute('BEGIN')
+        try:
+            db.execute(
+                'SELECT count(*) FROM post WHERE author_id = ?', (author,)
+            ).fetchone()
+            db.executemany(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                [(author, 'x' * rnd.randrange(50, 500), time.time())
+                 for _ in range(rows)],
+            )
+            db.execute('COMMIT')
+        finally:
+            if db.in_transaction:
+                db.rollback()
+
+    if retry:
+        transaction = sqlite.retry_locked(transaction)
+    committed = failed = 0
+    for _ in range(transactions):
+        try:
+            transaction()
+        except sqlite3.OperationalError as error:
+            if not sqlite.is_locked(error):
+                raise
+            failed += 1
+        else:
+            committed += 1
+    db.close()
+    return committed, failed
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость записи в SQLite с настройками Django '
+            'по умолчанию и с SQLITE_PRAGMAS при параллельных писателях')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', type=int, default=8,
+            help='Сколько процессов пишут одновременно'
+        )
+        parser.add_argument(
+            '--transactions', type=int, default=200,
+            help='Транзакций на писателя'
+        )
+        parser.add_argument(
+            '--rows', type=int, default=5,
+            help='Строк в транзакции'
+        )
+        parser.add_argument(
+            '--dir', default=settings.BASE_DIR,
+            help='Каталог для временной базы (тот же диск, что и у боевой)'
+        )
+
+    def handle(self, *args, **options):
+        # Соединения с базой нельзя делить между процессами.
+        connections.close_all()
+        results = {}
+        for name, pragmas, retry in MODES:
+            results[name] = self.run(name, pragmas, retry, options)
+        if results['default']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Ускорение: {results["tuned"] / results["default"]:.1f}x'
+            ))
+
+    def run(self, name, pragmas, retry, options):
+        root = tempfile.mkdtemp(prefix='bench-', dir=options['dir'])
+        path = os.path.join(root, 'bench.sqlite3')
+        try:
+            db = sqlite3.connect(path)
+            for statement in SCHEMA:
+                db.execute(statement)
+            db.close()
+            tasks = [
+                (path, pragmas, retry, options['transactions'],
+                 options['rows'], seed)
+                for seed in range(options['writers'])
+            ]
+            start = time.perf_counter()
+            with multiprocessing.Pool(options['writers']) as pool:
+                counts = pool.starmap(write, tasks)
+            elapsed = time.perf_counter() - start
+        finally:
+            shutil.rmtree(root)
+        committed = sum(done for done, _ in counts)
+        failed = sum(errors for _, errors in counts)
+        rate = committed / elapsed
+        self.stdout.write(
+            f'{name}: {committed} транзакций '
+            f'({committed * options["rows"]} строк) за {elapsed:.2f} с, '
+            f'{rate:.0f} тр/с, ошибок блокировки {failed}'
+        )
+        return rate
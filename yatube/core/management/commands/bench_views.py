@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import bench
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет все именованные URL posts, users и about тестовым '
+        'клиентом: p50/p95, число запросов и размер ответа для гостя '
+        'и пользователя; сравнивает с базовыми замерами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз запрашивать каждую страницу'
+        )
+        parser.add_argument(
+            '--username',
+            help='Пользователь для авторизованных замеров '
+                 '(по умолчанию тот, у кого больше всего подписок)'
+        )
+        parser.add_argument(
+            '--baseline', default=settings.BENCH_BASELINE,
+            help='JSON с базовыми замерами'
+        )
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Записать результаты как новые базовые замеры'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=settings.BENCH_THRESHOLD,
+            help='Допустимый относительный рост p95'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        paths = list(bench.urls(bench.samples(), settings.BENCH_SKIP_URLS))
+        results = {}
+        for variant, client in (('anonymous', bench.client()),
+                                ('user', bench.client(user))):
+            for name, path in paths:
+                key = f'{name} [{variant}]'
+                results[key] = bench.measure(
+                    client, path, options['repeat'], options['cold']
+                )
+                self.report(key, results[key])
+        if options['save']:
+            bench.save(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовые замеры записаны в {options["baseline"]}'
+            ))
+            return
+        baseline = bench.load(options['baseline'])
+        if baseline is None:
+            self.stdout.write('Базовых замеров нет, сравнивать не с чем')
+            return
+        found = bench.regressions(baseline, results, options['threshold'])
+        if found:
+            raise CommandError('Регрессии:\n' + '\n'.join(found))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def get_user(self, username):
+        users = User.objects.all()
+        if username:
+            users = users.filter(username=username)
+        user = users.order_by('-stats__following_count', 'pk').first()
+        if user is None:
+            raise CommandError('Нет пользователя для авторизованных замеров')
+        return user
+
+    def report(self, key, result):
+        self.stdout.write(
+            f'{key}: {result["status"]}, p50 {result["p50"]:.1f} мс, '
+            f'p95 {result["p95"]:.1f} мс, запросов {result["queries"]}, '
+            f'{result["bytes"]} байт'
+        )
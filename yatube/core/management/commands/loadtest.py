@@ -0,0 +1,132 @@
+import json
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from core import loadtest
+
+
+def transport(url):
+    if url:
+        return loadtest.HTTPTransport(url)
+    return loadtest.WSGITransport(import_string(settings.WSGI_APPLICATION))
+
+
+def run_process(url, target, scenarios_path, mix, threads, duration,
+                iterations, seed, offset):
+    """Прогон в дочернем процессе: свое приложение и свои соединения."""
+    scenarios = load_scenarios(scenarios_path)
+    return loadtest.run(transport(url), target, scenarios, mix, threads,
+                        duration, iterations, seed, offset)
+
+
+def load_scenarios(path):
+    scenarios = dict(loadtest.SCENARIOS)
+    if path:
+        scenarios.update(import_string(f'{path}.SCENARIOS'))
+    return scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает WSGI-приложение (или запущенный сервер) смесью '
+        'сценариев из пула потоков и процессов; печатает пропускную '
+        'способность, гистограммы задержек и долю ошибок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Виртуальных пользователей в каждом процессе'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Сколько процессов запускать'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность прогона, с'
+        )
+        parser.add_argument(
+            '--iterations', type=int,
+            help='Сценариев на пользователя (вместо --duration)'
+        )
+        parser.add_argument(
+            '--mix', default=loadtest.DEFAULT_MIX,
+            help='Веса сценариев: имя=вес через запятую'
+        )
+        parser.add_argument(
+            '--scenarios',
+            help='Модуль со словарем SCENARIOS дополнительных сценариев'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера (по умолчанию WSGI в процессе)'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--sample', type=int, default=1000,
+            help='Сколько постов и пользователей брать из базы'
+        )
+        parser.add_argument('--output', help='Записать сводку в JSON')
+        parser.add_argument(
+            '--compare', help='Сравнить со сводкой прошлого прогона'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            scenarios = load_scenarios(options['scenarios'])
+            mix = loadtest.parse_mix(options['mix'], scenarios)
+            target = loadtest.Target(options['sample'])
+        except (ImportError, ValueError) as error:
+            raise CommandError(error)
+        start = time.perf_counter()
+        samples = self.run(target, mix, options)
+        summary = loadtest.summarize(samples, time.perf_counter() - start)
+        self.report(summary)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(summary, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+            self.stdout.write('Сравнение с прошлым прогоном:')
+            for line in loadtest.compare(previous, summary):
+                self.stdout.write(f'  {line}')
+
+    def run(self, target, mix, options):
+        args = (target, options['scenarios'], mix, options['threads'],
+                options['duration'], options['iterations'], options['seed'])
+        if options['processes'] == 1:
+            return run_process(options['url'], *args, 0)
+        # Соединения с базой нельзя делить между процессами.
+        connections.close_all()
+        with multiprocessing.Pool(options['processes']) as pool:
+            results = pool.starmap(run_process, [
+                (options['url'], *args, number * options['threads'])
+                for number in range(options['processes'])
+            ])
+        return loadtest.merge(results)
+
+    def report(self, summary):
+        total = summary['total']
+        if total is None:
+            self.stdout.write('Запросов не было')
+            return
+        self.stdout.write(
+            f'Запросов: {total["count"]} за {summary["elapsed"]} с, '
+            f'{total["rps"]} в секунду, ошибок {total["error_rate"]:.2%}'
+        )
+        for line in loadtest.render_histogram(total['histogram']):
+            self.stdout.write(line)
+        for label, stats in summary['labels'].items():
+            self.stdout.write(
+                f'{label}: {stats["count"]} шт., {stats["rps"]}/с, '
+                f'p50 {stats["p50"]} мс, p95 {stats["p95"]} мс, '
+                f'p99 {stats["p99"]} мс, ошибок {stats["error_rate"]:.2%} '
+                f'{stats["statuses"]}'
+            )
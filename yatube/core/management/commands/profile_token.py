@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = 'Печатает заголовок, включающий профилирование запроса'
+
+    def handle(self, *args, **options):
+        header = settings.PROFILE_HEADER[len('HTTP_'):].replace('_', '-')
+        self.stdout.write(f'{header.title()}: {profiling.make_token()}')
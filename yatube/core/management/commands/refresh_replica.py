@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = 'Обновляет локальную SQLite-копию основной базы для чтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alias', default='replica',
+            help='Псевдоним реплики из settings.DATABASES'
+        )
+
+    def handle(self, *args, **options):
+        target = settings.DATABASES.get(options['alias'])
+        engines = {
+            settings.DATABASES['default']['ENGINE'],
+            target and target['ENGINE'],
+        }
+        if engines != {'django.db.backends.sqlite3'}:
+            raise CommandError('Копировать можно только SQLite в SQLite')
+        started = time.monotonic()
+        replicas.refresh(target['NAME'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Реплика {options["alias"]} обновлена за '
+            f'{time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = 'Показывает отставание реплик от основной базы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--beat', action='store_true',
+            help='Сначала обновить пульс в основной базе'
+        )
+
+    def handle(self, *args, **options):
+        if options['beat']:
+            replicas.beat()
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write('Реплики не настроены')
+        for alias in settings.DATABASE_REPLICAS:
+            lag = replicas.lag(alias)
+            if lag is None:
+                self.stdout.write(f'{alias}: пульса еще нет')
+            else:
+                self.stdout.write(
+                    f'{alias}: отставание {lag.total_seconds():.1f} с'
+                )
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+STALE_CHECK_INTERVAL = jobs.STALE_AFTER / 10
+
+
+def work(worker, stop, poll_interval, burst):
+    try:
+        return jobs.work(worker, stop, poll_interval, burst)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики очереди задач в потоках или процессах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOB_WORKERS,
+            help='Сколько задач выполнять параллельно'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Обработчики в отдельных процессах, а не в потоках'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда очередь опустеет'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди, с'
+        )
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших: {requeued}')
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        if options['processes']:
+            # Соединения с базой нельзя делить между процессами.
+            connections.close_all()
+            stop = multiprocessing.Event()
+            spawn = multiprocessing.Process
+        else:
+            stop = threading.Event()
+            spawn = threading.Thread
+        workers = [
+            spawn(target=work, args=(
+                f'{prefix}:{number}', stop,
+                options['poll_interval'], options['burst'],
+            ))
+            for number in range(options['workers'])
+        ]
+        previous = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            for worker in workers:
+                worker.start()
+            next_check = time.monotonic() + STALE_CHECK_INTERVAL
+            while any(worker.is_alive() for worker in workers):
+                stop.wait(options['poll_interval'])
+                if time.monotonic() >= next_check:
+                    jobs.requeue_stale()
+                    next_check += STALE_CHECK_INTERVAL
+        except KeyboardInterrupt:
+            stop.set()
+        finally:
+            for worker in workers:
+                worker.join()
+            signal.signal(signal.SIGTERM, previous)
+        self.report(started)
+
+    def report(self, started):
+        timings = (
+            Job.objects.filter(finished__gte=started)
+            .values('name', 'status')
+            .annotate(
+                total=Count('id'), avg=Avg('duration'), max=Max('duration')
+            )
+            .order_by('name', 'status')
+        )
+        for row in timings:
+            self.stdout.write(
+                f'{row["name"]} [{row["status"]}]: {row["total"]} шт., '
+                f'среднее {row["avg"]:.3f} с, максимум {row["max"]:.3f} с'
+            )
+        self.stdout.write(self.style.SUCCESS('Обработчики остановлены'))
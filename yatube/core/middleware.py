@@ -0,0 +1,162 @@
+import cProfile
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import profiling, replicas, templating
+from .queries import log_queries
+
+logger = logging.getLogger('core.queries')
+template_logger = logging.getLogger('core.templates')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы запроса и сверяет их с бюджетом вьюхи.
+
+    Бюджеты задаются в settings.QUERY_BUDGETS по имени вьюхи
+    ('posts:index'). При превышении в тестах поднимается
+    QueryBudgetExceeded, в остальных случаях пишется предупреждение.
+    Повторяющиеся запросы (признак N+1) попадают в лог. Запросы к
+    таблицам из settings.QUERY_BUDGET_IGNORE_TABLES не учитываются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with log_queries(settings.QUERY_BUDGET_IGNORE_TABLES) as log:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        logger.debug(
+            '%s: %d запросов, %.1f мс',
+            view_name, log.count, log.duration * 1000
+        )
+        duplicates = log.duplicates(settings.QUERY_DUPLICATES_THRESHOLD)
+        for sql, count in duplicates.items():
+            logger.warning('%s: запрос повторяется %d раз: %s',
+                           view_name, count, sql)
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is not None and log.count > budget:
+            message = (f'{view_name}: {log.count} запросов '
+                       f'при бюджете {budget}')
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ReplicaMiddleware:
+    """Направляет чтение вьюх из settings.REPLICA_VIEWS на реплики.
+
+    После успешного изменяющего запроса сессия на REPLICA_PIN_SECONDS
+    закрепляется за основной базой, чтобы пользователь сразу видел
+    свои изменения, даже если реплика отстает. Изменяющими считаются
+    все методы, кроме GET и HEAD, и вьюхи из settings.REPLICA_WRITE_VIEWS.
+    """
+
+    PIN_KEY = 'primary_until'
+    SAFE_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, '_replica_token', None)
+            if token is not None:
+                replicas.reset(token)
+        if self.writes(request) and response.status_code < 400:
+            request.session[self.PIN_KEY] = (
+                time.time() + settings.REPLICA_PIN_SECONDS
+            )
+        return response
+
+    def writes(self, request):
+        if request.method not in self.SAFE_METHODS:
+            return True
+        match = request.resolver_match
+        return (match is not None
+                and match.view_name in settings.REPLICA_WRITE_VIEWS)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.DATABASE_REPLICAS
+                and request.method in self.SAFE_METHODS
+                and request.resolver_match.view_name in settings.REPLICA_VIEWS
+                and request.session.get(self.PIN_KEY, 0) < time.time()):
+            request._replica_token = replicas.use_replica()
+
+
+class ProfileMiddleware:
+    """Профилирует cProfile выборку запросов и копит статистику по вьюхам.
+
+    Профилируется доля settings.PROFILE_SAMPLE_RATE запросов и каждый
+    запрос с подписанным токеном в заголовке PROFILE_HEADER
+    (manage.py profile_token). Остальные запросы идут мимо профайлера.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.sampled(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        match = request.resolver_match
+        profiling.record(match.view_name if match else 'unresolved',
+                         profiler)
+        return response
+
+    def sampled(self, request):
+        token = request.META.get(settings.PROFILE_HEADER)
+        if token is not None:
+            return profiling.valid_token(token)
+        rate = settings.PROFILE_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+
+class TemplateTimingMiddleware:
+    """Меряет рендеринг шаблонов, include, тегов и фильтров запроса.
+
+    Итог пишется в лог core.templates, а персоналу или при включенном
+    settings.TEMPLATE_TIMING_HEADER - в заголовок Server-Timing: общее
+    время и TEMPLATE_TIMING_TOP самых дорогих записей по собственному
+    времени. Замеры ставит core.templating.instrument().
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.TEMPLATE_TIMING:
+            return self.get_response(request)
+        with templating.log_renders() as log:
+            response = self.get_response(request)
+        if not log.entries:
+            return response
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        template_logger.debug('%s: шаблоны %.1f мс', view_name,
+                              log.total * 1000)
+        for kind, name, calls, total, own in log.top():
+            template_logger.debug(
+                '%s: %s %s x%d, %.1f мс, собственное %.1f мс',
+                view_name, kind, name, calls, total * 1000, own * 1000
+            )
+        user = getattr(request, 'user', None)
+        if settings.TEMPLATE_TIMING_HEADER or (user and user.is_staff):
+            response['Server-Timing'] = log.server_timing(
+                settings.TEMPLATE_TIMING_TOP
+            )
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Функция')),
+                ('payload', models.TextField(verbose_name='Аргументы (JSON)')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка')], default='queued', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Максимум попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Запустить не раньше')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Закончена')),
+                ('duration', models.FloatField(blank=True, null=True, verbose_name='Длительность, с')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Обработчик')),
+                ('error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'run_at'], name='job_status_run_at'),
+        ),
+    ]
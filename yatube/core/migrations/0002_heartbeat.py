@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Heartbeat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beat', models.DateTimeField(verbose_name='Пульс')),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    payload = models.TextField('Аргументы (JSON)')
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток', default=3
+    )
+    run_at = models.DateTimeField('Запустить не раньше', default=timezone.now)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    finished = models.DateTimeField('Закончена', null=True, blank=True)
+    duration = models.FloatField('Длительность, с', null=True, blank=True)
+    worker = models.CharField('Обработчик', max_length=100, blank=True)
+    error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='job_status_run_at'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class Heartbeat(models.Model):
+    """Метка времени в основной базе для замера отставания реплик."""
+
+    beat = models.DateTimeField('Пульс')
+
+    def __str__(self):
+        return f'Пульс {self.beat}'
@@ -0,0 +1,121 @@
+import fcntl
+import glob
+import os
+import pstats
+import re
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiling'
+TOKEN_VALUE = 'profile'
+SORTS = ('cumulative', 'tottime', 'ncalls')
+UNSAFE = re.compile(r'[^\w.-]')
+
+
+def make_token():
+    """Значение заголовка, включающего профилирование запроса."""
+    return signing.TimestampSigner(salt=SALT).sign(TOKEN_VALUE)
+
+
+def valid_token(value):
+    try:
+        return signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        ) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def view_dir(view_name):
+    return os.path.join(settings.PROFILE_ROOT,
+                        UNSAFE.sub('_', view_name.replace(':', '.')))
+
+
+@contextmanager
+def locked(directory):
+    """Блокировка каталога вьюхи между потоками и процессами (flock)."""
+    with open(os.path.join(directory, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def record(view_name, profiler):
+    """Добавляет профиль запроса в файл текущего окна его вьюхи.
+
+    Окно длится PROFILE_WINDOW секунд; от вьюхи хранятся последние
+    PROFILE_KEEP окон. Чтение, слияние и запись окна идут под flock,
+    поэтому воркеры-процессы не затирают профили друг друга. Файл
+    переписывается через временный, и читатели не видят его недописанным.
+    """
+    directory = view_dir(view_name)
+    window = int(time.time() // settings.PROFILE_WINDOW)
+    path = os.path.join(directory, f'{window * settings.PROFILE_WINDOW}.prof')
+    os.makedirs(directory, exist_ok=True)
+    with locked(directory):
+        stats = pstats.Stats(profiler)
+        if os.path.exists(path):
+            stats.add(path)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        stats.dump_stats(tmp)
+        os.replace(tmp, path)
+        for old in window_files(directory)[:-settings.PROFILE_KEEP]:
+            os.remove(old)
+
+
+def window_files(directory):
+    """Файлы окон от старых к новым: имена - время начала окна."""
+    return sorted(
+        glob.glob(os.path.join(directory, '*.prof')),
+        key=lambda path: int(os.path.basename(path).split('.')[0]),
+    )
+
+
+def views():
+    """Вьюхи со статистикой: имя каталога и число окон."""
+    root = settings.PROFILE_ROOT
+    if not os.path.isdir(root):
+        return {}
+    found = {}
+    for name in sorted(os.listdir(root)):
+        files = window_files(os.path.join(root, name))
+        if files:
+            found[name] = len(files)
+    return found
+
+
+def requests_count(stats):
+    """Сколько запросов в статистике: вызовы корневой функции."""
+    roots = [cc for cc, nc, tt, ct, callers in stats.stats.values()
+             if not callers]
+    return max(roots, default=0)
+
+
+def top(name, sort='cumulative', limit=None):
+    """Самые тяжелые функции вьюхи по всем хранимым окнам."""
+    files = window_files(os.path.join(settings.PROFILE_ROOT, name))
+    if not files:
+        return None
+    stats = pstats.Stats(*files)
+    stats.sort_stats(sort)
+    rows = []
+    for func in stats.fcn_list[:limit or settings.PROFILE_TOP]:
+        cc, nc, tt, ct, callers = stats.stats[func]
+        rows.append({
+            'function': pstats.func_std_string(func),
+            'ncalls': nc if nc == cc else f'{nc}/{cc}',
+            'tottime': tt,
+            'cumtime': ct,
+            'percall': ct / cc if cc else 0,
+        })
+    return {
+        'requests': requests_count(stats),
+        'total': stats.total_tt,
+        'windows': len(files),
+        'rows': rows,
+    }
@@ -0,0 +1,59 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+PLACEHOLDERS = re.compile(r'%s(\s*,\s*%s)+')
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO')
+
+
+def fingerprint(sql):
+    """Приводит запросы, отличающиеся только параметрами, к одному виду."""
+    sql = LITERALS.sub('?', sql)
+    return PLACEHOLDERS.sub('%s', sql)
+
+
+class QueryLog:
+    """Обертка execute_wrapper: считает запросы, время и повторы."""
+
+    def __init__(self, ignore=()):
+        self.ignore = ignore
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not self.ignored(sql):
+                self.record(sql, time.perf_counter() - start)
+
+    def ignored(self, sql):
+        return sql.startswith(TRANSACTION_CONTROL) or any(
+            table in sql for table in self.ignore
+        )
+
+    def record(self, sql, duration):
+        self.duration += duration
+        self.count += 1
+        self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold):
+        return {
+            sql: count for sql, count in self.fingerprints.items()
+            if count >= threshold
+        }
+
+
+@contextmanager
+def log_queries(ignore=()):
+    log = QueryLog(ignore)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
@@ -0,0 +1,100 @@
+import os
+import random
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Heartbeat
+
+# Модели этих приложений всегда читаются с основной базы: сессии
+# и хранилище миниатюр пишутся из читающих вьюх, очередь задач
+# и пульс обязаны видеть свежие данные.
+PRIMARY_APPS = {'sessions', 'thumbnail', 'core'}
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def use_replica():
+    """Включает чтение с реплик в текущем контексте; вернет токен сброса."""
+    return _use_replica.set(True)
+
+
+def reset(token):
+    _use_replica.reset(token)
+
+
+@contextmanager
+def primary():
+    """Чтение с основной базы внутри блока, например перед записью."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Читает с реплик только там, где это разрешил ReplicaMiddleware.
+
+    Пишет и мигрирует всегда основная база; вне помеченных запросов
+    (команды, формы, фоновые задачи) чтение тоже идет с нее.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not _use_replica.get()
+                or model._meta.app_label in PRIMARY_APPS):
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def beat():
+    """Отмечает текущее время в основной базе."""
+    now = timezone.now()
+    Heartbeat.objects.using('default').update_or_create(
+        pk=1, defaults={'beat': now}
+    )
+    return now
+
+
+def lag(alias):
+    """Отставание реплики: сколько прошло с пульса, который она видит."""
+    seen = Heartbeat.objects.using(alias).filter(
+        pk=1
+    ).values_list('beat', flat=True).first()
+    if seen is None:
+        return None
+    return timezone.now() - seen
+
+
+def refresh(path, source='default'):
+    """Пересоздает копию SQLite-базы по пути path через backup API.
+
+    Копия пишется рядом и подменяет старую атомарно, так что открытые
+    соединения дочитывают прежний файл, а новые видят свежий.
+    """
+    beat()
+    connection = connections[source]
+    connection.ensure_connection()
+    tmp = f'{path}.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    target = sqlite3.connect(tmp)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+    os.replace(tmp, path)
@@ -0,0 +1,97 @@
+import logging
+import os
+import random
+import sqlite3
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+
+logger = logging.getLogger('core.sqlite')
+
+PRAGMAS = settings.SQLITE_PRAGMAS
+RETRY_ATTEMPTS = settings.SQLITE_RETRY_ATTEMPTS
+RETRY_DELAY = settings.SQLITE_RETRY_DELAY
+LOCK_ERRORS = (OperationalError, sqlite3.OperationalError)
+
+
+def pragma_statements(pragmas=PRAGMAS):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def file_id(connection):
+    """Устройство и inode файла базы; None для базы в памяти."""
+    try:
+        stat = os.stat(connection.settings_dict['NAME'])
+    except (OSError, TypeError, ValueError):
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def configure(sender, connection, **kwargs):
+    """connection_created: настраивает новое соединение с SQLite.
+
+    Прагмы выполняются на сыром соединении, мимо журнала запросов
+    и бюджетов. В базе в памяти journal_mode остается memory.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for statement in pragma_statements():
+        connection.connection.execute(statement)
+    connection.file_id = file_id(connection)
+
+
+def check(connection):
+    """Закрывает соединение, если его нельзя переиспользовать.
+
+    Постоянное соединение с SQLite продолжает читать старый файл,
+    если базу подменили (например, refresh_replica), поэтому кроме
+    is_usable сверяется и inode.
+    """
+    if connection.connection is None or connection.in_atomic_block:
+        return
+    stale = connection.vendor == 'sqlite' and (
+        getattr(connection, 'file_id', None) != file_id(connection)
+    )
+    if stale or not connection.is_usable():
+        logger.info('Закрыто устаревшее соединение %s', connection.alias)
+        connection.close()
+
+
+def check_connections(**kwargs):
+    """request_started: проверка постоянных соединений (CONN_MAX_AGE)."""
+    for connection in connections.all():
+        check(connection)
+
+
+def is_locked(error):
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+def retry_locked(func=None, attempts=RETRY_ATTEMPTS, delay=RETRY_DELAY):
+    """Повторяет транзакцию, упавшую на блокировке SQLite.
+
+    Пауза растет экспонентой со случайным разбросом, чтобы писатели
+    не просыпались одновременно. Внутри чужой транзакции повтор
+    невозможен, и ошибка пробрасывается сразу.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, attempts + 1):
+                try:
+                    return func(*args, **kwargs)
+                except LOCK_ERRORS as error:
+                    if (attempt == attempts or not is_locked(error)
+                            or transaction.get_connection().in_atomic_block):
+                        raise
+                    pause = random.uniform(0, delay * 2 ** attempt)
+                    logger.warning('%s: %s, повтор %d через %.3f с',
+                                   func.__name__, error, attempt, pause)
+                    time.sleep(pause)
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
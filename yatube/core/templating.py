@@ -0,0 +1,163 @@
+import functools
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.template import engines
+from django.template.base import Template
+from django.template.library import InclusionNode, SimpleNode
+from django.utils.module_loading import import_string
+
+# Узлы встроенных и сторонних тегов, время которых стоит мерить:
+# имя тега -> класс узла.
+NODES = {
+    'url': 'django.template.defaulttags.URLNode',
+    'thumbnail': 'sorl.thumbnail.templatetags.thumbnail.ThumbnailNodeBase',
+}
+# Символы, недопустимые в строке desc заголовка Server-Timing.
+UNSAFE = re.compile(r'["\\\x00-\x1f]')
+
+_local = threading.local()
+
+
+class RenderLog:
+    """Время и число вызовов шаблонов, тегов и фильтров за запрос.
+
+    Время total включает вложенные шаблоны и теги, own - нет: сумма own
+    по всем записям равна времени рендеринга.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.stack = []
+
+    def start(self):
+        self.stack.append(0.0)
+        return time.perf_counter()
+
+    def stop(self, kind, name, start):
+        duration = time.perf_counter() - start
+        children = self.stack.pop()
+        if self.stack:
+            self.stack[-1] += duration
+        entry = self.entries.setdefault((kind, name), [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] += duration - children
+
+    @property
+    def total(self):
+        return sum(own for _, _, own in self.entries.values())
+
+    def top(self, limit=None):
+        """Записи (вид, имя, вызовы, total, own) по убыванию own."""
+        rows = sorted(
+            ((kind, name, *values)
+             for (kind, name), values in self.entries.items()),
+            key=lambda row: row[4], reverse=True,
+        )
+        return rows[:limit]
+
+    def server_timing(self, limit):
+        """Значение заголовка Server-Timing, время в миллисекундах."""
+        metrics = [f'templates;dur={self.total * 1000:.2f}']
+        for number, (kind, name, calls, _, own) in enumerate(
+                self.top(limit)):
+            desc = UNSAFE.sub('_', f'{kind} {name} x{calls}')
+            metrics.append(f'tpl{number};desc="{desc}";dur={own * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+@contextmanager
+def log_renders():
+    """Включает замеры в потоке; вложенный вызов пишет во внешний лог."""
+    log = getattr(_local, 'log', None)
+    if log is not None:
+        yield log
+        return
+    log = _local.log = RenderLog()
+    try:
+        yield log
+    finally:
+        _local.log = None
+
+
+def timed(kind, name_of):
+    """Обертка, записывающая вызов в текущий RenderLog, если он есть."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            log = getattr(_local, 'log', None)
+            if log is None:
+                return func(*args, **kwargs)
+            start = log.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                log.stop(kind, name_of(*args), start)
+        wrapper.timed = True
+        return wrapper
+    return decorator
+
+
+def template_name(template, *args):
+    return template.origin.template_name or template.name or '<string>'
+
+
+def func_name(node, *args):
+    return node.func.__name__
+
+
+def _set(owner, name, value):
+    if isinstance(owner, dict):
+        owner[name] = value
+    else:
+        setattr(owner, name, value)
+
+
+def patch(owner, name, kind, name_of, patched):
+    """Оборачивает метод класса или функцию словаря фильтров."""
+    func = owner[name] if isinstance(owner, dict) else getattr(owner, name)
+    if not getattr(func, 'timed', False):
+        _set(owner, name, timed(kind, name_of)(func))
+        patched.append((owner, name, func))
+
+
+def instrument():
+    """Подменяет рендеринг шаблонов, тегов и фильтров на замеряемый.
+
+    Шаблоны (и include, и extends) меряются в Template._render, теги
+    simple_tag и inclusion_tag - в их узлах, теги из NODES - в render
+    узла. Фильтры подменяются в библиотеках проекта и сторонних
+    приложений, поэтому вызывать функцию нужно до разбора шаблонов.
+    Возвращает сделанные подмены для uninstrument.
+    """
+    patched = []
+    patch(Template, '_render', 'template', template_name, patched)
+    patch(SimpleNode, 'render', 'tag', func_name, patched)
+    patch(InclusionNode, 'render', 'tag', func_name, patched)
+    for tag, path in NODES.items():
+        try:
+            node = import_string(path)
+        except ImportError:
+            continue
+        patch(node, 'render', 'tag', lambda *args, tag=tag: tag, patched)
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for library, path in engine.libraries.items():
+            if path.startswith('django.'):
+                continue
+            filters = engine.template_libraries[library].filters
+            for name in list(filters):
+                patch(filters, name, 'filter',
+                      lambda *args, name=name: name, patched)
+    return patched
+
+
+def uninstrument(patched):
+    """Возвращает на место то, что подменил вызов instrument."""
+    for owner, name, func in reversed(patched):
+        _set(owner, name, func)
@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import resolve
+
+from .queries import log_queries
+
+
+@contextmanager
+def query_budget(budget):
+    """Проверяет, что блок выполняет не больше budget запросов."""
+    with log_queries(settings.QUERY_BUDGET_IGNORE_TABLES) as log:
+        yield log
+    assert log.count <= budget, (
+        f'Выполнено {log.count} запросов при бюджете {budget}: '
+        + '; '.join(log.fingerprints)
+    )
+
+
+def assert_url_budget(client, url, budget=None):
+    """Запрашивает url и сверяет число запросов с бюджетом его вьюхи.
+
+    Без явного budget берется значение из settings.QUERY_BUDGETS.
+    Подходит и для TestCase, и для pytest-тестов с фикстурой client.
+    """
+    if budget is None:
+        budget = settings.QUERY_BUDGETS[resolve(url).view_name]
+    with query_budget(budget):
+        return client.get(url)
+
+
+@contextmanager
+def on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=True):
+    """Собирает (и выполняет) колбэки transaction.on_commit блока.
+
+    В TestCase транзакция не фиксируется и колбэки не срабатывают;
+    аналог TestCase.captureOnCommitCallbacks из Django 3.2.
+    """
+    callbacks = []
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    try:
+        yield callbacks
+    finally:
+        while True:
+            added = connection.run_on_commit[start:]
+            if not added:
+                break
+            start += len(added)
+            for _, callback in added:
+                callbacks.append(callback)
+                if execute:
+                    callback()
@@ -1,6 +1,50 @@
+import cProfile
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import Client, TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.template.base import Template
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+
+from . import (bench, jobs, loadtest, profiling, replicas, sqlite,
+               templating)
+from .middleware import QueryBudgetExceeded, ReplicaMiddleware
+from .models import Job
+from .queries import fingerprint, log_queries
+
+CALLS = []
+
+
+@jobs.job()
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.job(max_attempts=2)
+def explode():
+    raise ValueError('boom')
 
 
 class ViewTestClass(TestCase):
@@ -11,3 +55,483 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_budget_exceeded_raises_in_tests(self):
+        with self.settings(QUERY_BUDGETS={'posts:index': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
+
+    def test_budget_exceeded_is_logged_in_production(self):
+        with self.settings(QUERY_BUDGETS={'posts:index': 0},
+                           QUERY_BUDGET_RAISE=False):
+            with self.assertLogs('core.queries', level='WARNING'):
+                response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_duplicated_queries_are_detected(self):
+        User = get_user_model()
+        with log_queries() as log:
+            User.objects.filter(pk=1).exists()
+            User.objects.filter(pk=2).exists()
+        self.assertEqual(list(log.duplicates(2).values()), [2])
+
+    def test_fingerprint_ignores_parameters(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s) LIMIT 10'),
+        )
+
+
+class JobsTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def work(self):
+        return jobs.work('test', threading.Event(), burst=True)
+
+    def test_delayed_job_runs_in_worker(self):
+        job = record.delay('value')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(self.work(), 1)
+        job.refresh_from_db()
+        self.assertEqual(CALLS, ['value'])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.duration)
+
+    def test_claim_is_exclusive(self):
+        record.delay('value')
+        self.assertIsNotNone(jobs.claim('first'))
+        self.assertIsNone(jobs.claim('second'))
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = explode.delay()
+        with self.assertLogs('core.jobs', level='ERROR'):
+            self.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.error)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', level='ERROR'):
+            self.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_jobs_are_requeued(self):
+        job = record.delay('value')
+        jobs.claim('dead')
+        Job.objects.filter(pk=job.pk).update(
+            started=timezone.now() - timedelta(seconds=jobs.STALE_AFTER + 1)
+        )
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(self.work(), 1)
+        self.assertEqual(CALLS, ['value'])
+
+
+class RunWorkersTest(TransactionTestCase):
+    def test_workers_drain_queue(self):
+        CALLS.clear()
+        for number in range(5):
+            record.delay(number)
+        call_command('run_workers', workers=2, burst=True,
+                     poll_interval=0.01, stdout=StringIO())
+        self.assertEqual(sorted(CALLS), list(range(5)))
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTest(TestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        self.factory = RequestFactory()
+        self.session = SessionStore()
+
+    def routed_read(self, method, url):
+        """Куда уйдет чтение поста во время обработки запроса."""
+        request = getattr(self.factory, method)(url)
+        request.session = self.session
+        request.resolver_match = resolve(url)
+        seen = []
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            seen.append(self.router.db_for_read(Group))
+            return HttpResponse(status=302 if method == 'post' else 200)
+
+        middleware = ReplicaMiddleware(view)
+        middleware(request)
+        return seen[0]
+
+    def test_reads_leave_primary_only_when_allowed(self):
+        self.assertEqual(self.router.db_for_read(Group), 'default')
+        token = replicas.use_replica()
+        try:
+            self.assertEqual(self.router.db_for_read(Group), 'replica')
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+            self.assertEqual(self.router.db_for_write(Group), 'default')
+            with replicas.primary():
+                self.assertEqual(self.router.db_for_read(Group), 'default')
+        finally:
+            replicas.reset(token)
+        self.assertEqual(self.router.db_for_read(Group), 'default')
+
+    def test_list_views_read_from_replica(self):
+        self.assertEqual(self.routed_read('get', '/'), 'replica')
+        self.assertEqual(
+            self.routed_read('get', reverse('posts:post_create')), 'default'
+        )
+
+    def test_write_pins_session_to_primary(self):
+        self.routed_read('post', reverse('posts:post_create'))
+        self.assertEqual(self.routed_read('get', '/'), 'default')
+
+    def test_get_write_view_pins_session_to_primary(self):
+        url = reverse('posts:profile_follow', kwargs={'username': 'author'})
+        self.routed_read('get', url)
+        self.assertEqual(self.routed_read('get', '/'), 'default')
+
+
+class RefreshReplicaTest(TransactionTestCase):
+    # Копия снимается вне транзакции: backup ждет, пока база свободна.
+    def test_refresh_copies_primary_and_measures_lag(self):
+        Group.objects.create(title='Группа', slug='group', description='')
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        path = os.path.join(root, 'replica.sqlite3')
+        replicas.refresh(path)
+        copy = sqlite3.connect(path)
+        self.addCleanup(copy.close)
+        self.assertEqual(
+            copy.execute('SELECT slug FROM posts_group').fetchall(),
+            [('group',)],
+        )
+        self.assertEqual(
+            copy.execute('SELECT COUNT(*) FROM core_heartbeat').fetchone(),
+            (1,),
+        )
+        self.assertLess(replicas.lag('default'), timedelta(seconds=5))
+
+
+class SqliteTest(TestCase):
+    def test_pragmas_are_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_replaced_database_file_closes_connection(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        path = os.path.join(root, 'db.sqlite3')
+        probe = DatabaseWrapper(
+            dict(connection.settings_dict, NAME=path), alias='probe'
+        )
+        probe.ensure_connection()
+        self.addCleanup(probe.close)
+        journal = probe.connection.execute('PRAGMA journal_mode').fetchone()
+        self.assertEqual(journal, ('wal',))
+        sqlite.check(probe)
+        self.assertIsNotNone(probe.connection)
+        sqlite3.connect(f'{path}.new').close()
+        os.replace(f'{path}.new', path)
+        sqlite.check(probe)
+        self.assertIsNone(probe.connection)
+
+    @mock.patch('core.sqlite.time.sleep')
+    def test_locked_write_is_retried(self, sleep):
+        calls = []
+
+        @sqlite.retry_locked(attempts=3)
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        # Тесты идут внутри транзакции, поэтому ее флаг подменяется.
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            with self.assertLogs('core.sqlite', 'WARNING') as logs:
+                self.assertEqual(write(), 'ok')
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    @mock.patch('core.sqlite.time.sleep')
+    def test_retry_gives_up(self, sleep):
+        @sqlite.retry_locked
+        def write():
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                write()
+        sleep.assert_not_called()
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            with self.assertLogs('core.sqlite', 'WARNING'):
+                with self.assertRaises(OperationalError):
+                    write()
+        self.assertEqual(sleep.call_count, sqlite.RETRY_ATTEMPTS - 1)
+
+
+class BenchViewsTest(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.baseline = os.path.join(root, 'baseline.json')
+        user = get_user_model().objects.create_user(username='reader')
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='')
+        Post.objects.create(author=user, group=group, text='Текст поста')
+
+    def run_bench(self, **options):
+        call_command('bench_views', repeat=2, baseline=self.baseline,
+                     stdout=StringIO(), **options)
+
+    def test_every_named_url_is_measured(self):
+        self.run_bench(save=True)
+        results = bench.load(self.baseline)
+        expected = {
+            name for name, _ in bench.named_urls()
+        } - settings.BENCH_SKIP_URLS - {'posts:sitemap_shard'}
+        for variant in ('anonymous', 'user'):
+            self.assertEqual(
+                {key for key in results if key.endswith(f'[{variant}]')},
+                {f'{name} [{variant}]' for name in expected},
+            )
+        result = results['posts:index [user]']
+        self.assertEqual(result['status'], HTTPStatus.OK)
+        self.assertLessEqual(result['p50'], result['p95'])
+        self.assertGreater(result['bytes'], 0)
+
+    def test_regression_fails_the_run(self):
+        self.run_bench(save=True)
+        results = bench.load(self.baseline)
+        # Время в тестах шумит, поэтому проверяется только число запросов.
+        self.run_bench(threshold=1000)
+        results['posts:post_detail [user]']['queries'] -= 1
+        bench.save(self.baseline, results)
+        with self.assertRaisesMessage(CommandError, 'posts:post_detail'):
+            self.run_bench(threshold=1000)
+
+    def test_search_query_is_encoded(self):
+        paths = dict(bench.urls({'query': 'кот & #пёс'}))
+        self.assertEqual(
+            paths['posts:search'],
+            reverse('posts:search') + '?q=%D0%BA%D0%BE%D1%82+%26+%23'
+            '%D0%BF%D1%91%D1%81',
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(bench.percentile(values, 50), 50)
+        self.assertEqual(bench.percentile(values, 95), 95)
+        self.assertEqual(bench.percentile([7], 95), 7)
+
+
+class LoadTestTest(TransactionTestCase):
+    # Потоки не видят данных из транзакции TestCase. Пользователь один:
+    # общая база в памяти блокирует таблицы, не дожидаясь busy_timeout.
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.output = os.path.join(root, 'summary.json')
+        get_user_model().objects.create_user(username='reader')
+        author = get_user_model().objects.create_user(username='author')
+        Post.objects.create(author=author, text='Текст поста')
+
+    def load(self, mix):
+        call_command('loadtest', threads=1, iterations=4, mix=mix,
+                     output=self.output, stdout=StringIO())
+        return bench.load(self.output)
+
+    def test_comments_pass_csrf_and_login(self):
+        summary = self.load('comment=1')
+        self.assertEqual(summary['total']['errors'], 0)
+        self.assertEqual(summary['buckets'], list(loadtest.BUCKETS))
+        self.assertEqual(
+            summary['labels']['POST posts:add_comment']['statuses'],
+            {'302': 4},
+        )
+        self.assertEqual(summary['labels']['scenario comment']['count'], 4)
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_follow_scenario_leaves_no_follows(self):
+        summary = self.load('follow=1')
+        self.assertEqual(summary['total']['errors'], 0)
+        self.assertEqual(
+            summary['labels']['GET posts:profile_follow']['statuses'],
+            {'302': 4},
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unknown_scenario_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, 'missing'):
+            call_command('loadtest', mix='missing=1', stdout=StringIO())
+
+
+def record_profiles(count):
+    for _ in range(count):
+        profiler = cProfile.Profile()
+        profiler.runcall(sorted, range(10))
+        profiling.record('about:author', profiler)
+
+
+class ProfileMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_override = override_settings(PROFILE_ROOT=root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        self.url = reverse('about:author')
+
+    def test_unsampled_request_is_not_profiled(self):
+        with mock.patch('cProfile.Profile') as profile:
+            self.client.get(self.url, HTTP_X_PROFILE='forged')
+            self.client.get(self.url)
+        profile.assert_not_called()
+        self.assertEqual(profiling.views(), {})
+
+    def test_signed_header_profiles_request(self):
+        self.client.get(self.url, HTTP_X_PROFILE=profiling.make_token())
+        self.assertEqual(profiling.views(), {'about.author': 1})
+        stats = profiling.top('about.author')
+        self.assertEqual(stats['requests'], 1)
+        self.assertTrue(stats['rows'])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0)
+    def test_windows_are_merged_and_rotated(self):
+        with mock.patch('time.time', return_value=7200.0):
+            self.client.get(self.url)
+            self.client.get(self.url)
+        self.assertEqual(profiling.top('about.author')['requests'], 2)
+        with override_settings(PROFILE_KEEP=2):
+            for hour in (3, 4):
+                with mock.patch('time.time', return_value=hour * 3600.0):
+                    self.client.get(self.url)
+        files = profiling.window_files(profiling.view_dir('about:author'))
+        self.assertEqual([os.path.basename(path) for path in files],
+                         ['10800.prof', '14400.prof'])
+
+    def test_processes_do_not_lose_profiles(self):
+        context = multiprocessing.get_context('fork')
+        with mock.patch('time.time', return_value=7200.0):
+            workers = [context.Process(target=record_profiles, args=(20,))
+                       for _ in range(2)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        self.assertEqual([worker.exitcode for worker in workers], [0, 0])
+        self.assertEqual(profiling.top('about.author')['requests'], 40)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0)
+    def test_page_is_for_staff_only(self):
+        self.client.get(self.url)
+        url = reverse('core:profiles')
+        user = get_user_model().objects.create_user(username='reader')
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        user.is_staff = True
+        user.save()
+        response = self.client.get(url, {'view': 'about.author',
+                                         'sort': 'tottime'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['sort'], 'tottime')
+        self.assertGreaterEqual(response.context['stats']['requests'], 1)
+
+    def test_profile_token_command(self):
+        out = StringIO()
+        call_command('profile_token', stdout=out)
+        header, token = out.getvalue().strip().split(': ')
+        self.assertEqual(header, 'X-Profile')
+        self.assertTrue(profiling.valid_token(token))
+
+
+class TemplateTimingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Тестовый раннер подменяет Template._render после ready().
+        cls.patched = templating.instrument()
+
+    @classmethod
+    def tearDownClass(cls):
+        templating.uninstrument(cls.patched)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader')
+        self.client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        self.client.force_login(self.user)
+
+    def entries(self, path):
+        with templating.log_renders() as log:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response, {(kind, name): calls
+                          for kind, name, calls, _, _ in log.top()}
+
+    @override_settings(TEMPLATE_TIMING_HEADER=True)
+    def test_templates_includes_and_tags_are_counted(self):
+        for number in range(3):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+        response, entries = self.entries(reverse('posts:index'))
+        self.assertEqual(entries[('template', 'posts/index.html')], 1)
+        self.assertEqual(entries[('template', 'base.html')], 1)
+        self.assertEqual(entries[('template', 'includes/post_card.html')], 3)
+        self.assertEqual(entries[('tag', 'post_cards')], 1)
+        self.assertIn(('tag', 'url'), entries)
+        header = response['Server-Timing']
+        self.assertTrue(header.startswith('templates;dur='))
+        self.assertEqual(header.count('tpl'),
+                         min(len(entries), settings.TEMPLATE_TIMING_TOP))
+
+    def test_custom_filter_is_counted(self):
+        _, entries = self.entries(reverse('posts:post_create'))
+        self.assertGreater(entries[('filter', 'addclass')], 0)
+
+    def test_own_time_adds_up_to_total(self):
+        log = templating.RenderLog()
+        outer = log.start()
+        inner = log.start()
+        log.stop('template', 'inner.html', inner)
+        log.stop('template', 'outer.html', outer)
+        (_, _, _, total, own), = [
+            row for row in log.top() if row[1] == 'outer.html'
+        ]
+        inner_total = log.entries[('template', 'inner.html')][1]
+        self.assertAlmostEqual(own, total - inner_total)
+        self.assertAlmostEqual(log.total, total)
+
+    @override_settings(TEMPLATE_TIMING_HEADER=False)
+    def test_header_is_for_staff_only(self):
+        url = reverse('posts:post_create')
+        response = self.client.get(url)
+        self.assertNotIn('Server-Timing', response)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertIn('Server-Timing', response)
+
+    def test_uninstrument_restores_render(self):
+        def render(template, context):
+            return ''
+
+        with mock.patch.object(Template, '_render', render):
+            patched = templating.instrument()
+            self.assertIsNot(Template._render, render)
+            templating.uninstrument(patched)
+            self.assertIs(Template._render, render)
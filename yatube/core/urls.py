@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('profiles/', views.profiles, name='profiles'),
+]
@@ -1,5 +1,8 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from . import profiling
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +18,21 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profiles(request):
+    views = profiling.views()
+    name = request.GET.get('view')
+    sort = request.GET.get('sort')
+    if sort not in profiling.SORTS:
+        sort = profiling.SORTS[0]
+    context = {
+        'title': 'Профили запросов',
+        'views': views,
+        'current': name,
+        'sort': sort,
+        'sorts': profiling.SORTS,
+        'stats': profiling.top(name, sort) if name in views else None,
+    }
+    return render(request, 'core/profiles.html', context)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import filter_posts
 
 CONS = '-пусто-'
 
@@ -19,6 +20,11 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = CONS
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
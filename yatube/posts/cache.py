@@ -0,0 +1,85 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache, caches
+from django.utils.cache import patch_cache_control
+
+FEED_VERSION_KEY = 'posts:feed_version'
+VERSIONS_CACHE = 'versions'
+
+
+def versions():
+    """Общий для всех процессов кэш версий (settings.CACHES)."""
+    return caches[VERSIONS_CACHE]
+
+
+def get_feed_version():
+    store = versions()
+    version = store.get(FEED_VERSION_KEY)
+    if version is None:
+        # После вытеснения ключа начинаем с метки времени, чтобы не
+        # совпасть с версией, под которой еще лежат старые страницы.
+        store.add(FEED_VERSION_KEY, int(time.time() * 1000), None)
+        version = store.get(FEED_VERSION_KEY)
+    return version
+
+
+def bump_feed_version():
+    """Меняет версию ленты; вызывать после фиксации транзакции."""
+    try:
+        versions().incr(FEED_VERSION_KEY)
+    except ValueError:
+        get_feed_version()
+
+
+def cache_feed(timeout):
+    """Кэширует ответы вьюхи на сервере под текущей версией ленты.
+
+    Ключ включает версию ленты, пользователя и адрес. Браузеру ответ
+    отдается с требованием перепроверки: свежесть страницы
+    обеспечивает ETag, а не max-age.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = (f'posts:page:{get_feed_version()}:'
+                   f'{request.user.pk}:{path}')
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    cache.set(key, response, timeout)
+            patch_cache_control(response, max_age=0, must_revalidate=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _version_key(kind, pk):
+    return f'posts:version:{kind}:{pk}'
+
+
+def get_versions(kind, pks):
+    """Версии объектов одного вида одним запросом к кэшу."""
+    keys = {pk: _version_key(kind, pk) for pk in set(pks) if pk is not None}
+    store = versions()
+    found = store.get_many(keys.values())
+    missing = {
+        key: int(time.time() * 1000)
+        for key in keys.values() if key not in found
+    }
+    if missing:
+        store.set_many(missing, None)
+        found.update(missing)
+    return {pk: found[key] for pk, key in keys.items()}
+
+
+def bump_version(kind, pk):
+    try:
+        versions().incr(_version_key(kind, pk))
+    except ValueError:
+        get_versions(kind, [pk])
@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from core import replicas
+
+from .models import Comment, Follow, Post, UserStats
+
+
+def increment(user_id, field):
+    with transaction.atomic():
+        updated = UserStats.objects.filter(user_id=user_id).update(
+            **{field: F(field) + 1}
+        )
+        if not updated:
+            recount_users([user_id])
+
+
+def decrement(user_id, field):
+    UserStats.objects.filter(
+        user_id=user_id, **{f'{field}__gt': 0}
+    ).update(**{field: F(field) - 1})
+
+
+def change_comments(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+
+def for_user(user):
+    """Счетчики пользователя; пересчитываются, если их еще нет."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        with replicas.primary():
+            recount_users([user.pk])
+            return UserStats.objects.get(user_id=user.pk)
+
+
+def _grouped(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids})
+        .order_by()
+        .values_list(field)
+        .annotate(total=Count('pk'))
+    )
+
+
+def recount_users(user_ids):
+    """Пересчитывает счетчики пользователей; возвращает число исправленных."""
+    posts = _grouped(Post.objects, 'author_id', user_ids)
+    followers = _grouped(Follow.objects, 'author_id', user_ids)
+    following = _grouped(Follow.objects, 'user_id', user_ids)
+    existing = UserStats.objects.in_bulk(user_ids)
+    changed, created = [], []
+    for user_id in user_ids:
+        actual = {
+            'posts_count': posts.get(user_id, 0),
+            'followers_count': followers.get(user_id, 0),
+            'following_count': following.get(user_id, 0),
+        }
+        stats = existing.get(user_id)
+        if stats is None:
+            created.append(UserStats(user_id=user_id, **actual))
+            continue
+        if any(getattr(stats, name) != value
+               for name, value in actual.items()):
+            for name, value in actual.items():
+                setattr(stats, name, value)
+            changed.append(stats)
+    UserStats.objects.bulk_create(created, ignore_conflicts=True)
+    UserStats.objects.bulk_update(changed, [
+        'posts_count', 'followers_count', 'following_count'
+    ])
+    return len(changed) + len(created)
+
+
+def recount_posts(post_ids):
+    """Пересчитывает комментарии постов; возвращает число исправленных."""
+    comments = _grouped(Comment.objects, 'post_id', post_ids)
+    changed = []
+    for post in Post.objects.filter(pk__in=post_ids).only('comments_count'):
+        actual = comments.get(post.pk, 0)
+        if post.comments_count != actual:
+            post.comments_count = actual
+            changed.append(post)
+    Post.objects.bulk_update(changed, ['comments_count'])
+    return len(changed)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import DigestState, Follow
+
+BATCH_SIZE = settings.DIGEST_BATCH_SIZE
+MAX_POSTS = settings.DIGEST_MAX_POSTS
+FIRST_WINDOW = timedelta(seconds=settings.DIGEST_FIRST_WINDOW)
+TEMPLATE = 'posts/email/digest.txt'
+CHUNK_SIZE = 2000
+
+
+def new_posts(until):
+    """Новые посты подписок всех подписчиков одним запросом.
+
+    Строки упорядочены по подписчику, поэтому их можно разбирать
+    потоком через groupby. Граница для подписчика - его sent_until,
+    а для новых подписчиков - последние FIRST_WINDOW.
+    """
+    since = Coalesce(
+        'user__digest__sent_until',
+        Value(until - FIRST_WINDOW, output_field=DateTimeField()),
+    )
+    return Follow.objects.exclude(user__email='').annotate(
+        since=since
+    ).filter(
+        author__posts__pub_date__gt=F('since'),
+        author__posts__pub_date__lte=until,
+    ).order_by(
+        'user_id', '-author__posts__pub_date', '-author__posts__id'
+    ).values_list(
+        'user_id', 'user__email', 'user__username',
+        'author__posts__id', 'author__posts__text',
+        'author__posts__pub_date', 'author__username',
+    ).iterator(CHUNK_SIZE)
+
+
+def digests(until):
+    """Пары (id подписчика, письмо) по одной на подписчика."""
+    for user_id, rows in groupby(new_posts(until), key=lambda row: row[0]):
+        rows = list(rows)
+        _, email, username = rows[0][:3]
+        posts = [
+            {'id': pk, 'text': text, 'pub_date': pub_date, 'author': author}
+            for _, _, _, pk, text, pub_date, author in rows[:MAX_POSTS]
+        ]
+        body = render_to_string(TEMPLATE, {
+            'username': username,
+            'posts': posts,
+            'more': len(rows) - len(posts),
+            'base_url': settings.SITEMAP_BASE_URL,
+        })
+        yield user_id, EmailMessage(
+            f'Yatube: новые посты ({len(rows)})', body, to=[email]
+        )
+
+
+def mark_sent(user_ids, until):
+    with transaction.atomic():
+        DigestState.objects.filter(user_id__in=user_ids).update(
+            sent_until=until
+        )
+        DigestState.objects.bulk_create([
+            DigestState(user_id=user_id, sent_until=until)
+            for user_id in user_ids
+        ], ignore_conflicts=True)
+
+
+def send(batch_size=BATCH_SIZE, until=None):
+    """Рассылает дайджесты пачками через одно соединение с почтой.
+
+    После каждой отправленной пачки сдвигается граница ее подписчиков,
+    так что при сбое повторно письма получат только те, чья пачка
+    не ушла. Возвращает число отправленных писем.
+    """
+    until = until or timezone.now()
+    pending = digests(until)
+    sent = 0
+    with get_connection() as connection:
+        while True:
+            batch = list(islice(pending, batch_size))
+            if not batch:
+                return sent
+            user_ids = [user_id for user_id, _ in batch]
+            connection.send_messages([message for _, message in batch])
+            mark_sent(user_ids, until)
+            sent += len(batch)
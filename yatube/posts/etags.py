@@ -0,0 +1,127 @@
+import functools
+import hashlib
+import os
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.middleware.csrf import get_token
+
+from .cache import get_feed_version, get_versions
+from .models import Follow, Post, TimelineEntry, User
+from .paginator import CursorPaginator
+
+POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+
+
+@functools.lru_cache(maxsize=None)
+def templates_digest():
+    """Отпечаток файлов шаблонов проекта; считается раз за процесс."""
+    digest = hashlib.md5()
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        for root, dirs, files in sorted(os.walk(directory)):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(path.encode())
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+    return digest.hexdigest()
+
+
+def release():
+    """Метка выпуска: settings.RELEASE или отпечаток шаблонов."""
+    return settings.RELEASE or templates_digest()
+
+
+def make_etag(request, *parts):
+    """ETag из данных страницы с учетом выпуска, пользователя и курсора.
+
+    Для вошедшего пользователя в ETag входят ключ сессии и секрет CSRF:
+    страница с формой не отдастся 304 со старым токеном после нового
+    входа. get_token ставит cookie, если ее еще нет.
+
+    Функции ниже принимают аргументы вьюхи и считаются до построения
+    контекста; None означает, что вьюха ответит как обычно (404).
+    """
+    session = None
+    if request.user.is_authenticated:
+        get_token(request)
+        session = (request.session.session_key,
+                   request.META.get('CSRF_COOKIE'))
+    raw = repr((release(), request.user.pk, session,
+                request.GET.get('cursor'), parts))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_rows(queryset, request, ordering=('pub_date', 'id'), prefix=''):
+    """Id, время изменения и версии автора и группы постов страницы."""
+    paginator = CursorPaginator(queryset, POSTS_PER_PAGE, ordering)
+    rows = paginator.peek(
+        request.GET.get('cursor'), ordering[1], f'{prefix}updated',
+        f'{prefix}author_id', f'{prefix}group_id',
+    )
+    users = get_versions('user', [row[2] for row in rows])
+    groups = get_versions('group', [row[3] for row in rows])
+    return [
+        (pk, updated.timestamp(), users[author_id], groups.get(group_id))
+        for pk, updated, author_id, group_id in rows
+    ]
+
+
+def index(request):
+    # Тело главной берется из кэша под версией ленты: она входит в ETag,
+    # чтобы старое тело не закрепилось в браузере под свежим ETag.
+    return make_etag(request, get_feed_version(),
+                     page_rows(Post.objects.all(), request))
+
+
+def group_posts(request, slug):
+    rows = page_rows(Post.objects.filter(group__slug=slug), request)
+    # Пустую или несуществующую группу отдаем без проверки.
+    return make_etag(request, rows) if rows else None
+
+
+def profile(request, username):
+    following = Follow.objects.filter(
+        user_id=request.user.pk, author=OuterRef('pk')
+    )
+    author = User.objects.filter(username=username).annotate(
+        is_followed=Exists(following)
+    ).values_list(
+        'pk', 'is_followed', 'stats__posts_count',
+        'stats__followers_count', 'stats__following_count',
+    ).first()
+    if author is None:
+        return None
+    author_id = author[0]
+    return make_etag(
+        request,
+        author,
+        get_versions('user', [author_id]),
+        page_rows(Post.objects.filter(author_id=author_id), request),
+    )
+
+
+def post_detail(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'comments_count', 'author_id', 'group_id',
+        'author__stats__posts_count',
+    ).first()
+    if post is None:
+        return None
+    updated, comments_count, author_id, group_id, posts_count = post
+    return make_etag(
+        request,
+        updated.timestamp(),
+        comments_count,
+        posts_count,
+        get_versions('user', [author_id]),
+        get_versions('group', [group_id]),
+    )
+
+
+def follow_index(request):
+    return make_etag(request, page_rows(
+        TimelineEntry.objects.filter(user=request.user), request,
+        ordering=('pub_date', 'post_id'), prefix='post__',
+    ))
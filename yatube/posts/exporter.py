@@ -0,0 +1,151 @@
+import csv
+import json
+import logging
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = settings.EXPORT_CHUNK_SIZE
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Поля совпадают с тем, что читает import_yatube.
+FIELDS = {
+    'posts': ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+    'comments': ('id', 'post', 'author', 'text', 'created'),
+}
+
+
+def posts(author):
+    rows = (
+        Post.objects.filter(author=author)
+        .order_by('pub_date', 'id')
+        .values_list('id', 'group__slug', 'text', 'pub_date', 'image')
+    )
+    for pk, group, text, pub_date, image in rows.iterator(CHUNK_SIZE):
+        yield {
+            'id': pk,
+            'author': author.username,
+            'group': group or '',
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'image': image,
+        }
+
+
+def comments(author):
+    rows = (
+        Comment.objects.filter(author=author)
+        .order_by('created', 'id')
+        .values_list('id', 'post_id', 'text', 'created')
+    )
+    for pk, post_id, text, created in rows.iterator(CHUNK_SIZE):
+        yield {
+            'id': pk,
+            'post': post_id,
+            'author': author.username,
+            'text': text,
+            'created': created.isoformat(),
+        }
+
+
+RECORDS = {'posts': posts, 'comments': comments}
+
+
+def to_jsonl(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def to_csv(records, fields):
+    writer = csv.DictWriter(_Echo(), fields)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def render(kind, author, fmt):
+    """Строки выгрузки kind автора в формате jsonl или csv."""
+    records = RECORDS[kind](author)
+    if fmt == 'csv':
+        return to_csv(records, FIELDS[kind])
+    return to_jsonl(records)
+
+
+def images(author):
+    return (
+        Post.objects.filter(author=author)
+        .exclude(image='')
+        .order_by('image')
+        .values_list('image', flat=True)
+        .distinct()
+        .iterator(CHUNK_SIZE)
+    )
+
+
+def read_file(name):
+    with default_storage.open(name) as file:
+        while True:
+            chunk = file.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class _Sink:
+    """Файл только для записи: zipfile пишет в него, генератор забирает."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def stream_zip(author, fmt):
+    """Zip-архив с постами, комментариями и картинками по кускам.
+
+    Архив пишется в поток без перемотки, поэтому ни он, ни файлы
+    картинок целиком в памяти не держатся.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for kind in RECORDS:
+            info = zipfile.ZipInfo(f'{kind}.{fmt}')
+            info.compress_type = zipfile.ZIP_DEFLATED
+            lines = (line.encode() for line in render(kind, author, fmt))
+            yield from _add(archive, sink, info, lines)
+        for name in images(author):
+            if not default_storage.exists(name):
+                logger.warning('Нет файла картинки %s', name)
+                continue
+            # Картинки уже сжаты, повторно их не сжимаем.
+            yield from _add(
+                archive, sink, zipfile.ZipInfo(name), read_file(name)
+            )
+    yield from sink.drain()
+
+
+def _add(archive, sink, info, chunks):
+    with archive.open(info, 'w', force_zip64=True) as entry:
+        for chunk in chunks:
+            entry.write(chunk)
+            yield from sink.drain()
+    yield from sink.drain()
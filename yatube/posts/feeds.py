@@ -0,0 +1,110 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from .cache import cache_feed, get_feed_version
+from .etags import release
+from .models import Group, Post, User
+
+FEED_ITEMS = settings.FEED_ITEMS
+FEED_CACHE = settings.FEED_CACHE_TIME
+
+
+def feed_etag(request, *args, **kwargs):
+    """ETag ленты без запросов к базе: выпуск, версия ленты и адрес."""
+    raw = f'{release()}:{get_feed_version()}:{request.get_full_path()}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def serve(feed_class):
+    """Вьюха ленты: кэш по версии ленты и ответ 304 без запросов к базе."""
+    view = cache_feed(FEED_CACHE)(feed_class())
+    return condition(etag_func=feed_etag)(view)
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние посты'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return Post.objects.for_feed()[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(50)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_posts', kwargs={'slug': group.slug})
+
+    def items(self, group):
+        return group.posts.for_feed()[:FEED_ITEMS]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def items(self, author):
+        return author.posts.for_feed()[:FEED_ITEMS]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, group):
+        return group.description
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, author):
+        return self.description(author)
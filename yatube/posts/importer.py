@@ -0,0 +1,233 @@
+import csv
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+FAST_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',
+}
+
+
+def read_records(stream, fmt):
+    """Записи из JSONL или CSV по одной, не читая файл целиком."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_moment(value):
+    if not value:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_id(value):
+    return int(value) if value not in (None, '') else None
+
+
+class IdMap:
+    """Словарь имя -> id; недостающие строки создаются одной пачкой."""
+
+    def __init__(self, model, field, defaults):
+        self.model = model
+        self.field = field
+        self.defaults = defaults
+        self.ids = dict(
+            model.objects.values_list(field, 'id').iterator()
+        )
+        self.created = 0
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if not missing:
+            return
+        self.model.objects.bulk_create([
+            self.model(**{self.field: key}, **self.defaults(key))
+            for key in missing
+        ], ignore_conflicts=True)
+        self.ids.update(
+            self.model.objects.filter(**{f'{self.field}__in': missing})
+            .values_list(self.field, 'id')
+        )
+        self.created += len(missing)
+
+
+def user_map():
+    return IdMap(User, 'username',
+                 lambda username: {'password': make_password(None)})
+
+
+def group_map():
+    return IdMap(Group, 'slug',
+                 lambda slug: {'title': slug, 'description': ''})
+
+
+def post_rows(batch, users, groups):
+    users.resolve(record['author'] for record in batch)
+    groups.resolve(record.get('group') for record in batch)
+    for record in batch:
+        pub_date = parse_moment(record.get('pub_date'))
+        yield Post(
+            id=parse_id(record.get('id')),
+            author_id=users.ids[record['author']],
+            group_id=groups.ids.get(record.get('group')),
+            text=record['text'],
+            image=record.get('image') or '',
+            pub_date=pub_date,
+            updated=pub_date,
+        )
+
+
+def comment_rows(batch, users, groups):
+    users.resolve(record['author'] for record in batch)
+    for record in batch:
+        yield Comment(
+            id=parse_id(record.get('id')),
+            post_id=int(record['post']),
+            author_id=users.ids[record['author']],
+            text=record['text'],
+            created=parse_moment(record.get('created')),
+        )
+
+
+def follow_rows(batch, users, groups):
+    users.resolve(record[field] for record in batch
+                  for field in ('user', 'author'))
+    for record in batch:
+        if record['user'] != record['author']:
+            yield Follow(
+                user_id=users.ids[record['user']],
+                author_id=users.ids[record['author']],
+            )
+
+
+KINDS = {
+    'posts': (Post, post_rows),
+    'comments': (Comment, comment_rows),
+    'follows': (Follow, follow_rows),
+}
+
+
+def write_batch(kind, batch, users, groups):
+    """Пишет пачку записей одним bulk_create; возвращает число строк.
+
+    Если у всех строк заданы id, конфликты игнорируются: повтор пачки
+    после падения между коммитом и сохранением контрольной точки
+    не создает дублей. Подписки уникальны сами по себе.
+    """
+    model, rows = KINDS[kind]
+    objs = list(rows(batch, users, groups))
+    ignore = model is Follow or all(obj.id is not None for obj in objs)
+    model.objects.bulk_create(objs, ignore_conflicts=ignore)
+    return len(objs)
+
+
+@contextmanager
+def keep_dates(model):
+    """Отключает auto_now/auto_now_add, чтобы сохранить даты из файла."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+@contextmanager
+def fast_sqlite(enabled=True):
+    """Ослабляет гарантии SQLite на время загрузки и затем их возвращает.
+
+    При падении процесса посреди загрузки файл базы может оказаться
+    поврежден, поэтому режим включается только явно.
+    """
+    if not enabled or connection.vendor != 'sqlite':
+        yield
+        return
+    saved = {}
+    with connection.cursor() as cursor:
+        for name, value in FAST_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}')
+            saved[name] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in saved.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def reset_sequences(model):
+    """Сдвигает автоинкремент после вставки строк с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Checkpoint:
+    """Число загруженных записей в файле рядом с источником."""
+
+    def __init__(self, path, kind, source):
+        self.path = path
+        self.key = {'kind': kind, 'source': os.path.abspath(source)}
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return 0
+        if {name: state.get(name) for name in self.key} != self.key:
+            raise ValueError(
+                f'Контрольная точка {self.path} относится к другой загрузке'
+            )
+        return state['done']
+
+    def save(self, done):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as file:
+            json.dump({**self.key, 'done': done}, file)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+
+
+class LRUKVStore(KVStore):
+    """Хранилище sorl-thumbnail с LRU-кэшем процесса перед кэшем и базой.
+
+    Найденные метаданные картинок и миниатюр держатся в памяти процесса,
+    поэтому на прогретой странице {% thumbnail %} и post_thumbnail
+    не ходят ни в кэш, ни в базу. Отсутствующие ключи не запоминаются:
+    миниатюра может появиться в другом потоке или процессе.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.max_size = settings.THUMBNAIL_LRU_SIZE
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._lru),
+            }
+
+    def clear(self, delete_thumbnails=False):
+        with self._lock:
+            self._lru.clear()
+        super().clear(delete_thumbnails)
+
+    def _get_raw(self, key):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+            self.misses += 1
+        value = super()._get_raw(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self._remember(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        with self._lock:
+            for key in keys:
+                self._lru.pop(key, None)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
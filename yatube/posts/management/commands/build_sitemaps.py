@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает карту сайта в статические файлы: шарды по диапазонам id '
+        'и индекс; неизмененные шарды не переписываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default=settings.SITEMAP_BASE_URL,
+            help='Адрес сайта для ссылок в карте'
+        )
+        parser.add_argument(
+            '--shard-size', type=int, default=settings.SITEMAP_SHARD_SIZE,
+            help='Сколько id приходится на один файл (не больше 50000)'
+        )
+
+    def handle(self, *args, **options):
+        stats = sitemaps.build(
+            options['base_url'], shard_size=options['shard_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Переписано шардов: {stats["written"]}, '
+            f'без изменений: {stats["unchanged"]}, '
+            f'удалено: {stats["removed"]}'
+        ))
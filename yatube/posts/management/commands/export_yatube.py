@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты и комментарии автора в JSONL, CSV или zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--what', choices=sorted(exporter.RECORDS), default='posts',
+            help='Что выгружать (без --zip)'
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl'
+        )
+        parser.add_argument(
+            '--zip', action='store_true',
+            help='Архив с постами, комментариями и файлами картинок'
+        )
+        parser.add_argument(
+            '-o', '--output', default='-',
+            help='Куда писать (по умолчанию stdout)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["username"]}')
+        if options['zip']:
+            chunks = exporter.stream_zip(author, options['format'])
+        else:
+            chunks = (
+                line.encode() for line in
+                exporter.render(options['what'], author, options['format'])
+            )
+        if options['output'] == '-':
+            self.write(chunks, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(chunks, output)
+
+    def write(self, chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
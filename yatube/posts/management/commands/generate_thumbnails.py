@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def generate(name):
+    try:
+        thumbnails.try_generate(name)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры для картинок уже опубликованных постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько миниатюр создавать параллельно (1 - без пула)'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        images = (
+            Post.objects.exclude(image='')
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+            .iterator()
+        )
+        done = 0
+        if workers <= 1:
+            for name in images:
+                thumbnails.try_generate(name)
+                done += 1
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while True:
+                    chunk = list(islice(images, workers * 10))
+                    if not chunk:
+                        break
+                    list(executor.map(generate, chunk))
+                    done += len(chunk)
+                    self.stdout.write(f'Обработано картинок: {done}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, картинок: {done}'))
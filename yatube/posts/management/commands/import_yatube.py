@@ -0,0 +1,114 @@
+import time
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+
+from posts import importer
+from posts.cache import bump_feed_version
+
+REPORT_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSONL или CSV '
+        'пачками через bulk_create; после падения продолжает '
+        'с контрольной точки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importer.KINDS))
+        parser.add_argument('path', help='Файл .jsonl или .csv')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат файла (по умолчанию по расширению)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько записей вставлять в одной транзакции'
+        )
+        parser.add_argument(
+            '--fast', action='store_true',
+            help='Отключить синхронизацию и журнал SQLite на время загрузки'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки (по умолчанию <path>.checkpoint)'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на контрольную точку'
+        )
+        parser.add_argument(
+            '--skip-recount', action='store_true',
+            help='Не пересчитывать счетчики и ленты после загрузки'
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        checkpoint = importer.Checkpoint(
+            options['checkpoint'] or f'{path}.checkpoint', kind, path
+        )
+        if options['restart']:
+            checkpoint.clear()
+        try:
+            done = checkpoint.load()
+        except ValueError as error:
+            raise CommandError(error)
+        if done:
+            self.stdout.write(f'Продолжаем с записи {done}')
+        users, groups = importer.user_map(), importer.group_map()
+        self.load(kind, path, fmt, options, checkpoint, done, users, groups)
+        self.stdout.write(
+            f'Создано пользователей: {users.created}, '
+            f'групп: {groups.created}'
+        )
+        checkpoint.clear()
+        if not options['skip_recount']:
+            call_command('recount', stdout=self.stdout)
+            if kind in ('posts', 'follows'):
+                call_command('rebuild_timelines', stdout=self.stdout)
+        bump_feed_version()
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
+
+    def load(self, kind, path, fmt, options, checkpoint, done,
+             users, groups):
+        model, _ = importer.KINDS[kind]
+        started = last_report = time.monotonic()
+        loaded = 0
+        with open(path, newline='') as stream, \
+                importer.fast_sqlite(options['fast']), \
+                importer.keep_dates(model):
+            records = importer.read_records(stream, fmt)
+            for _ in islice(records, done):
+                pass
+            for batch in importer.batches(records, options['batch_size']):
+                try:
+                    with transaction.atomic():
+                        loaded += importer.write_batch(
+                            kind, batch, users, groups
+                        )
+                except (DatabaseError, KeyError, ValueError) as error:
+                    raise CommandError(
+                        f'Записи {done + 1}-{done + len(batch)}: {error!r}'
+                    )
+                done += len(batch)
+                checkpoint.save(done)
+                now = time.monotonic()
+                if now - last_report >= REPORT_INTERVAL:
+                    self.report(done, loaded, now - started)
+                    last_report = now
+            importer.reset_sequences(model)
+        self.report(done, loaded, time.monotonic() - started)
+
+    def report(self, done, loaded, elapsed):
+        rate = loaded / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Обработано записей: {done}, вставлено строк: {loaded}, '
+            f'{rate:.0f} строк/с'
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок и обрезает их до заданной длины'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты нужно пересобрать (по умолчанию все)'
+        )
+        parser.add_argument(
+            '--length', type=int, default=timeline.TIMELINE_LENGTH,
+            help='Сколько записей хранить в ленте каждого пользователя'
+        )
+        parser.add_argument(
+            '--trim-only', action='store_true',
+            help='Только обрезать ленты, не пересобирая их'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = users.order_by('pk').values_list('pk', flat=True)
+        if options['trim_only']:
+            timeline.trim(user_ids, options['length'])
+            done = user_ids.count()
+        else:
+            done = 0
+            for user_id in user_ids.iterator():
+                timeline.rebuild(user_id, options['length'])
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано лент: {done}'))
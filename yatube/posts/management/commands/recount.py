@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, комментариев и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк пересчитывать за один проход'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        users = self.recount(User.objects, counters.recount_users, chunk_size)
+        posts = self.recount(Post.objects, counters.recount_posts, chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков: пользователи {users}, посты {posts}'
+        ))
+
+    def recount(self, manager, recount_chunk, chunk_size):
+        fixed = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                manager.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not pks:
+                return fixed
+            fixed += recount_chunk(pks)
+            last_pk = pks[-1]
@@ -0,0 +1,101 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import importer, search
+from posts.cache import bump_feed_version
+from posts.seed import UNTIL, Dataset, insert, parse_until
+
+REPORT_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу воспроизводимым синтетическим набором данных '
+        'для замеров: пользователи, группы, посты, комментарии '
+        'и подписки со степенным распределением'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя'
+        )
+        parser.add_argument(
+            '--celebrities', type=int, default=5,
+            help='Сколько авторов читает заметная доля пользователей'
+        )
+        parser.add_argument(
+            '--reach', type=float, default=0.3,
+            help='Доля пользователей, подписанных на каждую знаменитость'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --until разложить посты'
+        )
+        parser.add_argument(
+            '--until', type=parse_until, default=UNTIL,
+            help='Конец периода постов, дата ISO 8601 (UTC); '
+                 f'по умолчанию {UNTIL.date().isoformat()}'
+        )
+        parser.add_argument(
+            '--password',
+            help='Пароль всех пользователей (по умолчанию вход закрыт)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Сколько строк вставлять в одной транзакции'
+        )
+        parser.add_argument(
+            '--fast', action='store_true',
+            help='Отключить синхронизацию и журнал SQLite на время загрузки'
+        )
+        parser.add_argument(
+            '--skip-recount', action='store_true',
+            help='Не пересчитывать счетчики и ленты после загрузки'
+        )
+
+    def handle(self, *args, **options):
+        dataset = Dataset(**{
+            name: options[name] for name in (
+                'seed', 'users', 'groups', 'posts', 'comments', 'follows',
+                'celebrities', 'reach', 'alpha', 'days', 'until',
+                'password',
+            )
+        })
+        with importer.fast_sqlite(options['fast']):
+            with search.paused_index():
+                for model, rows in dataset.tables():
+                    self.load(model, rows, options['batch_size'])
+                    importer.reset_sequences(model)
+            if not options['skip_recount']:
+                call_command('recount', stdout=self.stdout)
+                call_command('rebuild_timelines', stdout=self.stdout)
+        bump_feed_version()
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    def load(self, model, rows, batch_size):
+        name = model._meta.verbose_name_plural
+        started = last_report = time.monotonic()
+        done = 0
+        for done in insert(model, rows, batch_size):
+            now = time.monotonic()
+            if now - last_report >= REPORT_INTERVAL:
+                self.report(name, done, now - started)
+                last_report = now
+        self.report(name, done, time.monotonic() - started)
+
+    def report(self, name, done, elapsed):
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f'{name}: {done} строк, {rate:.0f} строк/с')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import digests
+
+
+class Command(BaseCommand):
+    help = 'Рассылает подписчикам дайджесты новых постов их авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=digests.BATCH_SIZE,
+            help='Сколько писем отправлять за один вызов почтового бэкенда'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        sent = digests.send(options['batch_size'])
+        elapsed = time.monotonic() - started
+        rate = sent / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено писем: {sent} за {elapsed:.1f} с, '
+            f'{rate:.0f} писем/с'
+        ))
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+TIMELINE_LENGTH = 1000
+
+
+def fill_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    user_ids = Follow.objects.values_list('user_id', flat=True).distinct()
+    for user_id in user_ids:
+        posts = Post.objects.filter(
+            author__following__user_id=user_id
+        ).order_by('-pub_date').values_list('id', 'pub_date')
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts[:TIMELINE_LENGTH]
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_auto_20220617_1606'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-pub_date', '-post'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='timeline_user_pub_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_pub_date'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_pub_date'),
+        ),
+    ]
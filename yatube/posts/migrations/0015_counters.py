@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk')).values('total')
+    Post.objects.update(comments_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0014_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписок')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
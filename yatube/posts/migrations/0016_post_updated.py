@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:40
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
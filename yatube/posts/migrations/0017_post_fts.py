@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:10
+
+from django.db import migrations
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post "
+    "BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TABLE IF EXISTS posts_post_fts',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0018_comment_post_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='digest', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('sent_until', models.DateTimeField(verbose_name='Посты отправлены по')),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 500
+
+
+def counted(model, field):
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def fill_user_stats(apps, schema_editor):
+    """Создает счетчики пользователям, зарегистрированным до 0015."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    users = User.objects.filter(stats__isnull=True).annotate(
+        posts_total=counted(Post, 'author'),
+        followers_total=counted(Follow, 'author'),
+        following_total=counted(Follow, 'user'),
+    ).values_list(
+        'pk', 'posts_total', 'followers_total', 'following_total'
+    )
+    batch = []
+    for user_id, posts, followers, following in users.iterator():
+        batch.append(UserStats(
+            user_id=user_id,
+            posts_count=posts,
+            followers_count=followers,
+            following_count=following,
+        ))
+        if len(batch) == BATCH_SIZE:
+            UserStats.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserStats.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_digeststate'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,17 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты с автором и группой одним запросом, без лишних колонок."""
+        return self.select_related('author', 'group').only(
+            'id', 'text', 'pub_date', 'updated', 'image', 'comments_count',
+            'author__id', 'author__username',
+            'author__first_name', 'author__last_name',
+            'group__id', 'group__slug', 'group__title',
+        )
+
+
 class Post(models.Model):
     group = models.ForeignKey(
         Group,
@@ -25,6 +36,7 @@ class Post(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True,
         db_index=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -35,14 +47,36 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class CommentQuerySet(models.QuerySet):
+    def for_thread(self):
+        """Комментарии с авторами одним запросом."""
+        return self.select_related('author').only(
+            'id', 'text', 'created', 'post_id',
+            'author__id', 'author__username',
+        )
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -60,8 +94,14 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -84,3 +124,59 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_follow')
         ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry')
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0)
+    following_count = models.PositiveIntegerField(
+        'Количество подписок', default=0)
+
+    def __str__(self):
+        return f'Счетчики {self.user_id}'
+
+
+class DigestState(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='digest',
+    )
+    sent_until = models.DateTimeField('Посты отправлены по')
+
+    def __str__(self):
+        return f'Дайджест {self.user_id} по {self.sent_until}'
@@ -0,0 +1,154 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Наибольшее значение INTEGER в SQLite: id больше этого из курсора
+# вызвали бы OverflowError при подстановке в запрос.
+MAX_ID = 2 ** 63 - 1
+
+
+class Uncounted(Exception):
+    """Курсорная пагинация не считает объекты.
+
+    В шаблонах обращение к count и page_range молча дает пустое
+    значение, а не лишний COUNT(*).
+    """
+
+    silent_variable_failure = True
+
+
+def pack(values):
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def unpack(cursor):
+    """Список значений из курсора; ValueError для испорченного курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, TypeError, UnicodeDecodeError) as error:
+        raise ValueError(error)
+    if not isinstance(values, list):
+        raise ValueError(cursor)
+    return values
+
+
+def check_id(value):
+    """id из курсора; ValueError для нецелого или вне диапазона SQLite."""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(value)
+    if not 0 < value <= MAX_ID:
+        raise ValueError(value)
+    return value
+
+
+def encode_cursor(position, backwards=False):
+    moment, pk = position
+    return pack([moment.isoformat(), pk, int(backwards)])
+
+
+def decode_cursor(cursor):
+    """Возвращает (позиция, назад) или (None, False) для пустого курсора."""
+    if not cursor:
+        return None, False
+    try:
+        moment, pk, backwards = unpack(cursor)
+        moment = parse_datetime(moment)
+        pk = check_id(pk)
+    except (TypeError, ValueError):
+        return None, False
+    if moment is None or backwards not in (0, 1):
+        return None, False
+    return (moment, pk), bool(backwards)
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Страницы не нумеруются: вместо номера передается непрозрачный
+    курсор, а наличие следующей страницы определяется по лишней
+    строке выборки. Для преобразования строк выборки в объекты
+    страницы можно передать item (например, запись ленты -> пост).
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('pub_date', 'id'), item=None):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.item = item
+        self.has_next = False
+        self.has_previous = False
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def get_page(self, cursor):
+        position, backwards = decode_cursor(cursor)
+        rows = list(self._seek(position, backwards)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_previous = position is not None
+            self.has_next = has_more
+        if rows:
+            if self.has_next:
+                self.next_cursor = encode_cursor(self._position(rows[-1]))
+            if self.has_previous:
+                self.previous_cursor = encode_cursor(
+                    self._position(rows[0]), backwards=True
+                )
+        else:
+            self.has_next = self.has_previous = False
+        items = [self.item(row) for row in rows] if self.item else rows
+        # Номер и число страниц условные: страница 2, если есть
+        # предыдущая, и на одну больше, если есть следующая. Так методы
+        # Page.has_next()/has_previous() работают без COUNT(*).
+        return Page(items, 1 + self.has_previous, self)
+
+    page = get_page
+
+    @property
+    def count(self):
+        raise Uncounted
+
+    @property
+    def num_pages(self):
+        return 1 + self.has_previous + self.has_next
+
+    @property
+    def page_range(self):
+        raise Uncounted
+
+    def peek(self, cursor, *fields):
+        """Поля строк страницы cursor одним легким запросом, без объектов."""
+        position, backwards = decode_cursor(cursor)
+        return list(
+            self._seek(position, backwards)
+            .values_list(*fields)[:self.per_page + 1]
+        )
+
+    def _seek(self, position, backwards):
+        date_field, pk_field = self.ordering
+        queryset = self.object_list
+        lookup = 'gt' if backwards else 'lt'
+        if position is not None:
+            moment, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__{lookup}': moment})
+                | Q(**{date_field: moment, f'{pk_field}__{lookup}': pk})
+            )
+        if backwards:
+            return queryset.order_by(date_field, pk_field)
+        return queryset.order_by(f'-{date_field}', f'-{pk_field}')
+
+    def _position(self, row):
+        date_field, pk_field = self.ordering
+        return getattr(row, date_field), getattr(row, pk_field)
@@ -0,0 +1,106 @@
+import math
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .models import Post
+from .paginator import check_id, pack, unpack
+
+FTS_TABLE = 'posts_post_fts'
+WORDS = re.compile(r'\w+')
+INSERT_TRIGGER = 'posts_post_fts_insert'
+INSERT_TRIGGER_SQL = (
+    f'CREATE TRIGGER IF NOT EXISTS {INSERT_TRIGGER} '
+    f'AFTER INSERT ON posts_post BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); '
+    f'END'
+)
+
+RANKED_SQL = f'''
+    SELECT rowid, rank FROM (
+        SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+    )
+    {{where}}
+    ORDER BY rank, rowid
+    LIMIT %s
+'''
+
+
+def build_query(text):
+    """Запрос FTS5 из пользовательского ввода: все слова, последнее - префикс.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 во вводе
+    не интерпретируются.
+    """
+    words = WORDS.findall(text)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(text, cursor=None, limit=10):
+    """Посты по релевантности и курсор следующей страницы.
+
+    Курсор хранит (rank, id) последнего результата, поэтому любая
+    страница выдачи - это один проход по индексу без OFFSET.
+    """
+    match = build_query(text)
+    if not match:
+        return [], None
+    where, params = '', [match]
+    if cursor:
+        try:
+            rank, pk = unpack(cursor)
+            if isinstance(rank, bool) or not math.isfinite(rank):
+                raise ValueError(rank)
+            params += [float(rank), float(rank), check_id(pk)]
+            where = 'WHERE rank > %s OR (rank = %s AND rowid > %s)'
+        except (TypeError, ValueError):
+            params = [match]
+    with connection.cursor() as db:
+        db.execute(RANKED_SQL.format(where=where), params + [limit + 1])
+        rows = db.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pack(list(rows[-1][::-1]))
+    posts = Post.objects.for_feed().in_bulk([pk for pk, rank in rows])
+    return [posts[pk] for pk, rank in rows if pk in posts], next_cursor
+
+
+def filter_posts(queryset, text):
+    """Сужает queryset постов до совпадений в полнотекстовом индексе."""
+    match = build_query(text)
+    if not match:
+        return queryset.none()
+    return queryset.extra(
+        where=[f'{Post._meta.db_table}.id IN '
+               f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'],
+        params=[match],
+    )
+
+
+@contextmanager
+def paused_index():
+    """Массовая вставка постов без построчного обновления индекса.
+
+    Триггер вставки снимается на время блока, а затем индекс
+    пересобирается целиком: это быстрее, чем вставлять слова
+    каждого поста отдельно.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as db:
+        db.execute(f'DROP TRIGGER IF EXISTS {INSERT_TRIGGER}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as db:
+            db.execute(INSERT_TRIGGER_SQL)
+            db.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
@@ -0,0 +1,209 @@
+import random
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from faker import Faker
+
+from .importer import batches
+from .models import Comment, Follow, Group, Post, User
+
+# Сколько заготовок имен и фраз берется из Faker: генерировать их
+# на каждую строку из миллионов слишком медленно.
+POOL_SIZE = 2000
+GROUP_SHARE = 0.7
+COMMENT_DELAY = timedelta(days=2)
+# Конец периода постов по умолчанию: постоянный, чтобы один seed давал
+# одни и те же строки в любой день.
+UNTIL = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+FIELDS = {
+    User: ('id', 'password', 'is_superuser', 'username', 'first_name',
+           'last_name', 'email', 'is_staff', 'is_active', 'date_joined'),
+    Group: ('id', 'title', 'slug', 'description'),
+    Post: ('id', 'group', 'text', 'pub_date', 'updated', 'author', 'image',
+           'comments_count'),
+    Comment: ('id', 'post', 'author', 'text', 'created'),
+    Follow: ('user', 'author'),
+}
+
+
+def zipf_weights(size, alpha):
+    """Накопленные веса степенного закона: ранг 0 - самый популярный."""
+    return list(accumulate(1 / (rank + 1) ** alpha for rank in range(size)))
+
+
+def insert_sql(model):
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(name).column) for name in FIELDS[model]
+    )
+    values = ', '.join(['%s'] * len(FIELDS[model]))
+    return f'INSERT INTO {quote(model._meta.db_table)} ({columns}) ' \
+           f'VALUES ({values})'
+
+
+def insert(model, rows, batch_size):
+    """Пишет кортежи rows сырым executemany, пачка - одна транзакция.
+
+    Сигналы и счетчики не срабатывают; после загрузки нужны recount
+    и rebuild_timelines. Отдает число записанных строк после пачек.
+    """
+    sql = insert_sql(model)
+    done = 0
+    for batch in batches(rows, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        done += len(batch)
+        yield done
+
+
+def parse_until(value):
+    """Дата или дата со временем в ISO 8601; без зоны считается UTC."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        moment = datetime.combine(day, time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+class Dataset:
+    """Синтетические пользователи, группы, посты, комментарии, подписки.
+
+    Все случайное берется из одного seed, поэтому на пустой базе
+    одинаковые параметры дают одинаковые строки. Авторов постов
+    и цели подписок выбирает закон Ципфа по рангу пользователя,
+    а первые celebrities пользователей читает доля reach всех.
+    """
+
+    def __init__(self, seed=0, users=1000, groups=20, posts=10000,
+                 comments=20000, follows=20, celebrities=5, reach=0.3,
+                 alpha=1.1, days=365, until=None, password=None):
+        self.rnd = random.Random(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.sentences = [fake.sentence() for _ in range(POOL_SIZE)]
+        self.logins = [fake.user_name() for _ in range(POOL_SIZE)]
+        self.first_names = [fake.first_name() for _ in range(POOL_SIZE)]
+        self.last_names = [fake.last_name() for _ in range(POOL_SIZE)]
+        self.words = [fake.word() for _ in range(POOL_SIZE)]
+        self.counts = {User: users, Group: groups, Post: posts,
+                       Comment: comments, Follow: follows}
+        self.celebrities = min(celebrities, users)
+        self.reach = reach
+        self.ranks = zipf_weights(users, alpha)
+        self.group_ranks = zipf_weights(groups, alpha)
+        self.until = until or UNTIL
+        self.since = self.until - timedelta(days=days)
+        self.password = (
+            make_password(password, salt='yatubeseed') if password
+            else f'{UNUSABLE_PASSWORD_PREFIX}seed'
+        )
+        self.first = {
+            model: next_id(model) for model in (User, Group, Post, Comment)
+        }
+
+    def text(self):
+        return ' '.join(self.rnd.choices(self.sentences,
+                                         k=self.rnd.randint(1, 6)))
+
+    def moment(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def pub_date(self, index):
+        """Дата поста растет вместе с его номером."""
+        step = (self.until - self.since) / max(self.counts[Post], 1)
+        return self.since + step * index
+
+    def author(self, k=1):
+        return [self.first[User] + rank for rank in self.rnd.choices(
+            range(self.counts[User]), cum_weights=self.ranks, k=k
+        )]
+
+    def users(self):
+        joined = self.moment(self.since)
+        for index in range(self.counts[User]):
+            pk = self.first[User] + index
+            username = f'{self.rnd.choice(self.logins)}{pk}'
+            yield (
+                pk, self.password, False, username,
+                self.rnd.choice(self.first_names),
+                self.rnd.choice(self.last_names),
+                f'{username}@example.com', False, True, joined,
+            )
+
+    def groups(self):
+        for index in range(self.counts[Group]):
+            pk = self.first[Group] + index
+            yield (
+                pk, f'{self.rnd.choice(self.words).capitalize()} {pk}',
+                f'group-{pk}', self.text(),
+            )
+
+    def posts(self):
+        groups = range(self.first[Group], self.first[Group] + len(
+            self.group_ranks
+        ))
+        for index in range(self.counts[Post]):
+            group = None
+            if groups and self.rnd.random() < GROUP_SHARE:
+                group = self.rnd.choices(
+                    groups, cum_weights=self.group_ranks
+                )[0]
+            pub_date = self.moment(self.pub_date(index))
+            yield (
+                self.first[Post] + index, group, self.text(), pub_date,
+                pub_date, self.author()[0], '', 0,
+            )
+
+    def comments(self):
+        posts = self.counts[Post]
+        if not posts:
+            return
+        for index in range(self.counts[Comment]):
+            post = self.rnd.randrange(posts)
+            created = min(
+                self.pub_date(post) + COMMENT_DELAY * self.rnd.random(),
+                self.until,
+            )
+            yield (
+                self.first[Comment] + index, self.first[Post] + post,
+                self.author()[0], self.text(), self.moment(created),
+            )
+
+    def follows(self):
+        """Число подписок у пользователя распределено по Парето."""
+        users = self.counts[User]
+        celebrities = range(self.first[User],
+                            self.first[User] + self.celebrities)
+        for index in range(users):
+            pk = self.first[User] + index
+            size = int(self.counts[Follow] * self.rnd.paretovariate(2) / 2)
+            authors = set(self.author(min(size, users - 1)))
+            authors.update(author for author in celebrities
+                           if self.rnd.random() < self.reach)
+            authors.discard(pk)
+            for author in sorted(authors):
+                yield pk, author
+
+    def tables(self):
+        """Пары (модель, строки) в порядке, нужном внешним ключам."""
+        return (
+            (User, self.users()),
+            (Group, self.groups()),
+            (Post, self.posts()),
+            (Comment, self.comments()),
+            (Follow, self.follows()),
+        )
@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, thumbnails, timeline
+from .cache import bump_feed_version, bump_version
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(instance.author_id, 'posts_count')
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.decrement(instance.author_id, 'posts_count')
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id, 1)
+    else:
+        # Правка комментария должна сменить ETag страницы поста.
+        Post.objects.filter(pk=instance.post_id).update(
+            updated=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(instance.author_id, 'followers_count')
+        counters.increment(instance.user_id, 'following_count')
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.decrement(instance.author_id, 'followers_count')
+    counters.decrement(instance.user_id, 'following_count')
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=User)
+def feed_changed(sender, **kwargs):
+    # Версии меняются после фиксации: иначе читатель успеет положить
+    # в кэш под новой версией еще старые данные.
+    transaction.on_commit(bump_feed_version)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: bump_version('group', pk))
+    transaction.on_commit(bump_feed_version)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        pk = instance.pk
+        transaction.on_commit(lambda: bump_version('user', pk))
+        transaction.on_commit(bump_feed_version)
+
+
+@receiver(pre_save, sender=Post)
+def post_image_changing(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old_image = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('image', flat=True).first()
+    if old_image and old_image != instance.image.name:
+        transaction.on_commit(lambda: thumbnails.forget(old_image))
+
+
+@receiver(post_delete, sender=Post)
+def post_image_deleted(sender, instance, **kwargs):
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: thumbnails.forget(name))
@@ -0,0 +1,149 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from itertools import groupby
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.urls import reverse
+
+from .models import Group, Post, User
+
+CHUNK_SIZE = 2000
+INDEX_NAME = 'sitemap.xml'
+SHARD_PREFIX = 'sitemap-'
+
+URLSET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+URLSET_FOOTER = '</urlset>\n'
+INDEX_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+INDEX_FOOTER = '</sitemapindex>\n'
+
+
+def post_rows():
+    rows = Post.objects.order_by('id').values_list('id', 'updated')
+    for pk, updated in rows.iterator(CHUNK_SIZE):
+        yield pk, reverse('posts:post_detail', args=[pk]), updated
+
+
+def group_rows():
+    rows = Group.objects.order_by('id').values_list('id', 'slug')
+    for pk, slug in rows.iterator(CHUNK_SIZE):
+        yield pk, reverse('posts:group_posts', args=[slug]), None
+
+
+def profile_rows():
+    rows = User.objects.filter(
+        stats__posts_count__gt=0
+    ).order_by('id').values_list('id', 'username')
+    for pk, username in rows.iterator(CHUNK_SIZE):
+        yield pk, reverse('posts:profile', args=[username]), None
+
+
+SECTIONS = {
+    'posts': post_rows,
+    'groups': group_rows,
+    'profiles': profile_rows,
+}
+
+
+def url_entry(base_url, path, lastmod=None):
+    entry = f'<url><loc>{escape(base_url + path)}</loc>'
+    if lastmod is not None:
+        entry += f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+    return entry + '</url>\n'
+
+
+def shard_name(section, number):
+    return f'{SHARD_PREFIX}{section}-{number:05d}.xml'
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(64 * 1024), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def write_if_changed(path, lines):
+    """Пишет строки во временный файл и заменяет path, если он другой.
+
+    Возвращает True, если файл был переписан.
+    """
+    tmp = f'{path}.tmp'
+    digest = hashlib.sha256()
+    with open(tmp, 'wb') as file:
+        for line in lines:
+            data = line.encode()
+            digest.update(data)
+            file.write(data)
+    if digest.hexdigest() == file_hash(path):
+        os.remove(tmp)
+        return False
+    os.replace(tmp, path)
+    return True
+
+
+def build(base_url, root=None, shard_size=None):
+    """Собирает шарды и индекс карты сайта.
+
+    Строки каждого раздела читаются потоком по возрастанию id, и шард
+    отвечает за диапазон id. Поэтому новый или удаленный пост меняет
+    только свой шард, а остальные файлы остаются нетронутыми.
+    Возвращает число переписанных, неизмененных и удаленных шардов.
+    """
+    root = root or settings.SITEMAP_ROOT
+    shard_size = shard_size or settings.SITEMAP_SHARD_SIZE
+    os.makedirs(root, exist_ok=True)
+    base_url = base_url.rstrip('/')
+    stats = {'written': 0, 'unchanged': 0, 'removed': 0}
+    names = []
+    for section, rows in SECTIONS.items():
+        shards = groupby(rows(), key=lambda row: row[0] // shard_size)
+        for number, entries in shards:
+            name = shard_name(section, number)
+            names.append(name)
+            lines = (url_entry(base_url, path, lastmod)
+                     for _, path, lastmod in entries)
+            changed = write_if_changed(
+                os.path.join(root, name),
+                _wrap(URLSET_HEADER, lines, URLSET_FOOTER),
+            )
+            stats['written' if changed else 'unchanged'] += 1
+    for name in os.listdir(root):
+        if name.startswith(SHARD_PREFIX) and name not in names:
+            os.remove(os.path.join(root, name))
+            stats['removed'] += 1
+    write_if_changed(
+        os.path.join(root, INDEX_NAME),
+        _wrap(INDEX_HEADER, _index_entries(base_url, root, names),
+              INDEX_FOOTER),
+    )
+    return stats
+
+
+def _index_entries(base_url, root, names):
+    for name in names:
+        modified = datetime.fromtimestamp(
+            os.path.getmtime(os.path.join(root, name)), timezone.utc
+        )
+        path = reverse('posts:sitemap_shard', args=[name])
+        loc = escape(base_url + path)
+        yield (f'<sitemap><loc>{loc}</loc>'
+               f'<lastmod>{modified.date().isoformat()}</lastmod>'
+               '</sitemap>\n')
+
+
+def _wrap(header, lines, footer):
+    yield header
+    yield from lines
+    yield footer
@@ -0,0 +1,38 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..cache import get_versions
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def card_key(post, user_versions, group_versions):
+    return 'posts:card:{}:{}:{}:{}'.format(
+        post.pk,
+        post.updated.timestamp(),
+        user_versions[post.author_id],
+        group_versions.get(post.group_id, 0),
+    )
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки постов из кэша; недостающие рендерятся и кэшируются."""
+    posts = list(posts)
+    user_versions = get_versions('user', [post.author_id for post in posts])
+    group_versions = get_versions('group', [post.group_id for post in posts])
+    keys = [card_key(post, user_versions, group_versions) for post in posts]
+    cards = cache.get_many(keys)
+    rendered = {
+        key: render_to_string(CARD_TEMPLATE, {'post': post})
+        for key, post in zip(keys, posts) if key not in cards
+    }
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIME)
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
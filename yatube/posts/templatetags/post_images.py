@@ -0,0 +1,17 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, size='card'):
+    """URL готовой миниатюры или, пока она создается, исходной картинки."""
+    if not image:
+        return ''
+    thumbnail = thumbnails.find(image, size)
+    if thumbnail:
+        return thumbnail.url
+    thumbnails.schedule(image.name)
+    return image.url
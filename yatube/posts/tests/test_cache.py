@@ -1,8 +1,19 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.testing import on_commit_callbacks
+
+from ..cache import (bump_feed_version, bump_version, get_feed_version,
+                     get_versions)
 from ..models import Group, Post
 
 User = get_user_model()
@@ -14,6 +25,7 @@ class CacheTest(TestCase):
         super().setUpClass()
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='auth')
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -30,11 +42,147 @@ class CacheTest(TestCase):
 
     def test_cache_index_page(self):
         first_view = self.authorized_client.get(reverse('posts:index'))
-        post_first = Post.objects.get(id=self.post.id)
-        post_first.text = 'Changed text'
-        post_first.save()
+        Post.objects.filter(id=self.post.id).update(text='Changed text')
         second_view = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(first_view.content, second_view.content)
         cache.clear()
         third_view = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(first_view.content, third_view.content)
+
+    def test_cache_index_page_outlives_old_ttl(self):
+        first_view = self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(id=self.post.id).update(text='Changed text')
+        with mock.patch('django.core.cache.backends.locmem.time.time',
+                        return_value=time.time() + 60):
+            second_view = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(first_view.content, second_view.content)
+
+    def test_index_page_refreshes_on_post_save(self):
+        first_view = self.authorized_client.get(reverse('posts:index'))
+        self.post.text = 'Changed text'
+        with on_commit_callbacks():
+            self.post.save()
+        second_view = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotEqual(first_view.content, second_view.content)
+        self.assertContains(second_view, 'Changed text')
+
+    def test_index_page_refreshes_on_new_post(self):
+        self.authorized_client.get(reverse('posts:index'))
+        with on_commit_callbacks():
+            Post.objects.create(text='Brand new post', author=self.user)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Brand new post')
+
+    def test_index_page_refreshes_on_post_delete(self):
+        self.authorized_client.get(reverse('posts:index'))
+        with on_commit_callbacks():
+            self.post.delete()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Test text')
+
+    def test_pages_are_cached_on_server_only(self):
+        for url in (reverse('posts:index'), reverse('posts:feed_rss')):
+            with self.subTest(url=url):
+                self.client.get(url)
+                response = self.client.get(url)
+                self.assertEqual(response['Cache-Control'],
+                                 'max-age=0, must-revalidate')
+
+    def test_version_changes_after_commit(self):
+        version = get_feed_version()
+        with on_commit_callbacks():
+            Post.objects.create(text='Brand new post', author=self.user)
+            self.assertEqual(get_feed_version(), version)
+        self.assertNotEqual(get_feed_version(), version)
+
+    def test_login_does_not_bump_feed_version(self):
+        version = get_feed_version()
+        Client().force_login(self.user)
+        self.assertEqual(get_feed_version(), version)
+
+
+def bump_in_child():
+    bump_feed_version()
+    bump_version('user', 1)
+
+
+class SharedVersionsTest(TestCase):
+    def test_versions_are_shared_between_processes(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        caches = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'versions': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': root,
+            },
+        }
+        with override_settings(CACHES=caches):
+            feed = get_feed_version()
+            user = get_versions('user', [1])[1]
+            child = multiprocessing.get_context('fork').Process(
+                target=bump_in_child
+            )
+            child.start()
+            child.join()
+            self.assertEqual(child.exitcode, 0)
+            self.assertEqual(get_feed_version(), feed + 1)
+            self.assertEqual(get_versions('user', [1])[1], user + 1)
+
+
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Test group',
+            slug='test-slug',
+            description='Test description',
+        )
+        self.post = Post.objects.create(
+            text='Test text',
+            author=self.user,
+            group=self.group,
+        )
+
+    def render_cards(self):
+        return Template(
+            '{% load post_cards %}{% post_cards posts as cards %}'
+            '{% for card in cards %}{{ card }}{% endfor %}'
+        ).render(Context({'posts': Post.objects.all()}))
+
+    def test_card_is_shared_between_pages(self):
+        self.client.get(reverse('posts:index'))
+        with mock.patch('posts.templatetags.post_cards.render_to_string',
+                        side_effect=AssertionError) as render:
+            response = self.client.get(
+                reverse('posts:profile',
+                        kwargs={'username': self.user.username}))
+        render.assert_not_called()
+        self.assertContains(response, 'Test text')
+
+    def test_card_is_stale_until_post_changes(self):
+        self.render_cards()
+        Post.objects.filter(pk=self.post.pk).update(text='Changed text')
+        self.assertIn('Test text', self.render_cards())
+        self.post.text = 'Changed text'
+        self.post.save()
+        self.assertIn('Changed text', self.render_cards())
+
+    def test_card_refreshes_on_author_change(self):
+        self.render_cards()
+        self.user.first_name = 'Leo'
+        self.user.last_name = 'Tolstoy'
+        with on_commit_callbacks():
+            self.user.save()
+        self.assertIn('Leo Tolstoy', self.render_cards())
+
+    def test_card_refreshes_on_group_change(self):
+        self.render_cards()
+        self.group.slug = 'new-slug'
+        with on_commit_callbacks():
+            self.group.save()
+        self.assertIn('/group/new-slug/', self.render_cards())
@@ -0,0 +1,81 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Test text')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_post_counter(self):
+        Post.objects.create(author=self.author, text='Second post')
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2
+        )
+        self.post.delete()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+
+    def test_comment_counter(self):
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Comment'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Comment.objects.get(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_follow_counters(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}))
+        response = self.authorized_client.get(
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}))
+        self.assertEqual(response.context['stats'].followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_migration_fills_missing_stats(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().delete()
+        migration = import_module('posts.migrations.0020_fill_user_stats')
+        migration.fill_user_stats(apps, None)
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual((stats.posts_count, stats.followers_count,
+                          stats.following_count), (1, 1, 0))
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+
+    def test_recount_repairs_drift(self):
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        call_command('recount', chunk_size=1, stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import digests
+from ..models import DigestState, Follow, Post, User
+
+
+class DigestsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.readers = [
+            User.objects.create_user(
+                username=f'reader{number}', email=f'reader{number}@test.ru'
+            )
+            for number in range(3)
+        ]
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+        self.post = Post.objects.create(author=self.author, text='Новый пост')
+
+    def test_every_subscriber_gets_one_digest(self):
+        call_command('send_digests', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('Новый пост', mail.outbox[0].body)
+        self.assertEqual(DigestState.objects.count(), 3)
+
+    def test_digest_contains_only_new_posts(self):
+        digests.send()
+        mail.outbox.clear()
+        self.assertEqual(digests.send(), 0)
+        Post.objects.create(author=self.author, text='Еще один пост')
+        digests.send()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('Еще один пост', mail.outbox[0].body)
+        self.assertNotIn('Новый пост', mail.outbox[0].body)
+
+    def test_users_without_email_are_skipped(self):
+        reader = User.objects.create_user(username='silent')
+        Follow.objects.create(user=reader, author=self.author)
+        digests.send()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_first_digest_is_limited_by_window(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - digests.FIRST_WINDOW
+            - timedelta(hours=1)
+        )
+        self.assertEqual(digests.send(), 0)
+
+    def test_posts_are_fetched_with_one_query(self):
+        with self.assertNumQueries(1):
+            list(digests.new_posts(timezone.now()))
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+IMAGE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author,
+            group=group,
+            text='Текст поста',
+            image=SimpleUploadedFile(
+                name='small.gif', content=IMAGE, content_type='image/gif'
+            ),
+        )
+        Post.objects.create(author=self.author, text='Без картинки')
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse(
+            'posts:profile_export', kwargs={'username': 'author'}
+        )
+
+    def test_export_jsonl(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['id'], self.post.id)
+        self.assertEqual(records[0]['group'], 'group')
+        self.assertEqual(records[0]['image'], self.post.image.name)
+
+    def test_export_comments_csv(self):
+        response = self.client.get(
+            self.url, {'what': 'comments', 'format': 'csv'}
+        )
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['post'], str(self.post.id))
+        self.assertEqual(rows[0]['text'], 'Комментарий')
+
+    def test_export_zip_bundles_images(self):
+        response = self.client.get(self.url, {'zip': 1})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertEqual(
+            set(archive.namelist()),
+            {'posts.jsonl', 'comments.jsonl', self.post.image.name},
+        )
+        self.assertEqual(archive.read(self.post.image.name), IMAGE)
+        self.assertIsNone(archive.testzip())
+
+    def test_export_only_for_author(self):
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        response = other.get(self.url)
+        self.assertRedirects(
+            response,
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+
+    def test_export_command(self):
+        output = tempfile.NamedTemporaryFile(suffix='.jsonl')
+        self.addCleanup(output.close)
+        call_command('export_yatube', 'author', output=output.name)
+        with open(output.name) as file:
+            self.assertEqual(len(file.readlines()), 2)
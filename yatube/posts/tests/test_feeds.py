@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import on_commit_callbacks
+
+from ..models import Group, Post, User
+
+
+class FeedsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Test group', slug='test-slug', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Текст поста'
+        )
+        self.client = Client()
+        self.urls = [
+            reverse('posts:feed_rss'),
+            reverse('posts:feed_atom'),
+            reverse('posts:group_feed_rss', kwargs={'slug': 'test-slug'}),
+            reverse('posts:group_feed_atom', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile_feed_rss', kwargs={'username': 'author'}),
+            reverse('posts:profile_feed_atom', kwargs={'username': 'author'}),
+        ]
+
+    def test_feeds_list_posts(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Текст поста')
+
+    def test_unknown_group_feed_returns_404(self):
+        response = self.client.get(
+            reverse('posts:group_feed_rss', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_feed_costs_no_queries(self):
+        url = reverse('posts:group_feed_rss', kwargs={'slug': 'test-slug'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_release_invalidates_feed(self):
+        url = reverse('posts:feed_atom')
+        with self.settings(RELEASE='1.0'):
+            etag = self.client.get(url)['ETag']
+        with self.settings(RELEASE='1.1'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_post_invalidates_feed(self):
+        url = reverse('posts:feed_rss')
+        etag = self.client.get(url)['ETag']
+        with on_commit_callbacks():
+            Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый пост')
@@ -1,10 +1,15 @@
 from http import HTTPStatus
+from io import StringIO
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from ..models import Follow, Post
+from core.models import Job
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
 
 User = get_user_model()
 
@@ -78,3 +83,94 @@ class FollowViewsTests(TestCase):
         self.assertFalse(Follow.objects.filter(
             user=self.user_follower, author=self.user_follower
         ).exists())
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.follower = User.objects.create_user(username='follower')
+        self.old_post = Post.objects.create(
+            author=self.author,
+            text='Old post',
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+
+    def test_follow_backfills_timeline(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=self.old_post
+        ).exists())
+
+    def test_new_post_is_fanned_out(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='New post')
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2
+        )
+
+    def test_unfollow_removes_author_posts(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username}))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+
+    def test_trim_keeps_newest_entries(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='New post')
+        timeline.trim([self.follower.id], length=1)
+        entries = TimelineEntry.objects.filter(user=self.follower)
+        self.assertEqual(list(entries.values_list('post', flat=True)),
+                         [new_post.id])
+
+    def test_fan_out_queries_do_not_grow_with_followers(self):
+        for number in range(5):
+            user = User.objects.create_user(username=f'reader{number}')
+            Follow.objects.create(user=user, author=self.author)
+        post = Post.objects.create(author=self.author, text='New post')
+        Job.objects.all().delete()
+        # Выборка подписчиков, вставка записей и постановка задачи
+        # обрезки (проверка дубля и вставка).
+        with self.assertNumQueries(4):
+            timeline.fan_out(post)
+
+    def test_fan_out_leaves_trim_to_job(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.create(author=self.author, text='New post')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2
+        )
+        job = Job.objects.get(name=timeline.trim_followers.job_name)
+        timeline.trim_followers(self.author.id, length=1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 1
+        )
+        self.assertEqual(job.status, Job.QUEUED)
+
+    def test_trim_skips_short_timelines(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.create(author=self.author, text='New post')
+        timeline.trim(User.objects.values_list('pk', flat=True), length=1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 1
+        )
+        timeline.trim([self.follower.id], length=5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 1
+        )
+
+    def test_rebuild_command_restores_timeline(self):
+        Follow.objects.create(user=self.follower, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', self.follower.username,
+                     stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=self.old_post
+        ).exists())
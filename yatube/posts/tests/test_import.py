@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class ImportTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.author = User.objects.create_user(username='author')
+
+    def write_jsonl(self, name, records):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+        return path
+
+    def load(self, *args, **options):
+        call_command('import_yatube', *args, stdout=StringIO(), **options)
+
+    def test_import_posts(self):
+        path = self.write_jsonl('posts.jsonl', [
+            {'id': 100, 'author': 'author', 'group': 'new-group',
+             'text': 'Old post', 'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'id': 101, 'author': 'newcomer', 'text': 'Another post'},
+        ])
+        self.load('posts', path, batch_size=1)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertEqual(post.group.slug, 'new-group')
+        newcomer = User.objects.get(username='newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(UserStats.objects.get(user=newcomer).posts_count, 1)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_import_comments_csv(self):
+        post = Post.objects.create(author=self.author, text='Test text')
+        path = os.path.join(self.tmp, 'comments.csv')
+        with open(path, 'w') as file:
+            file.write('post,author,text,created\n')
+            file.write(f'{post.pk},author,First,2020-01-01T00:00:00\n')
+            file.write(f'{post.pk},reader,Second,\n')
+        self.load('comments', path)
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+
+    def test_import_follows_builds_timelines(self):
+        post = Post.objects.create(author=self.author, text='Test text')
+        path = self.write_jsonl('follows.jsonl', [
+            {'user': 'reader', 'author': 'author'},
+            {'user': 'reader', 'author': 'author'},
+            {'user': 'author', 'author': 'author'},
+        ])
+        self.load('follows', path)
+        reader = User.objects.get(username='reader')
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
+
+    def test_resume_from_checkpoint(self):
+        records = [
+            {'id': 200 + n, 'author': 'author', 'text': f'Post {n}'}
+            for n in range(3)
+        ]
+        records[2]['pub_date'] = 'not a date'
+        path = self.write_jsonl('posts.jsonl', records)
+        with self.assertRaises(CommandError):
+            self.load('posts', path, batch_size=1)
+        self.assertEqual(Post.objects.count(), 2)
+        with open(path + '.checkpoint') as file:
+            self.assertEqual(json.load(file)['done'], 2)
+        del records[2]['pub_date']
+        self.write_jsonl('posts.jsonl', records)
+        self.load('posts', path, batch_size=1)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Group.objects.count(), 0)
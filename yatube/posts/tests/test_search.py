@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..paginator import pack
+from ..search import build_query, filter_posts, search
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            text='Кошки любят молоко',
+            author=self.user,
+        )
+        Post.objects.create(text='Собаки любят кости', author=self.user)
+
+    def test_search_view_finds_post(self):
+        response = Client().get(reverse('posts:search'), {'q': 'кошки'})
+        self.assertEqual(response.context['posts'], [self.post])
+        self.assertContains(response, 'Кошки любят молоко')
+
+    def test_index_follows_edits_and_deletes(self):
+        self.post.text = 'Попугаи любят зерно'
+        self.post.save()
+        self.assertEqual(search('кошки')[0], [])
+        self.assertEqual(search('попугаи')[0], [self.post])
+        self.post.delete()
+        self.assertEqual(search('попугаи')[0], [])
+
+    def test_cursor_pages_through_results(self):
+        for number in range(5):
+            Post.objects.create(text=f'Любят все {number}', author=self.user)
+        first, cursor = search('любят', limit=4)
+        second, last_cursor = search('любят', cursor, limit=4)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 3)
+        self.assertIsNone(last_cursor)
+        self.assertFalse(set(first) & set(second))
+
+    def test_bad_cursor_shows_first_page(self):
+        cursors = (pack([-1.0, 10 ** 30]), pack(['x', 1]),
+                   pack([float('inf'), 1]), pack([-1.0, True]), 'broken')
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = Client().get(reverse('posts:search'),
+                                        {'q': 'кошки', 'cursor': cursor})
+                self.assertEqual(response.context['posts'], [self.post])
+
+    def test_query_operators_are_escaped(self):
+        self.assertEqual(build_query('NOT "кошки" OR'), '"NOT" "кошки" "OR"*')
+        self.assertEqual(search('"кошки*')[0], [self.post])
+        self.assertEqual(search('!!!'), ([], None))
+
+    def test_admin_search_uses_index(self):
+        found = filter_posts(Post.objects.all(), 'собаки')
+        self.assertEqual(list(found.values_list('text', flat=True)),
+                         ['Собаки любят кости'])
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+from ..seed import UNTIL, Dataset, parse_until
+
+User = get_user_model()
+
+
+class SeedTest(TestCase):
+    def rows(self, **options):
+        return [list(rows) for _, rows in Dataset(**options).tables()]
+
+    def test_same_seed_gives_same_rows(self):
+        until = datetime(2023, 6, 1, tzinfo=timezone.utc)
+        options = {'users': 20, 'groups': 2, 'posts': 30, 'comments': 10,
+                   'until': until}
+        self.assertEqual(self.rows(seed=1, **options),
+                         self.rows(seed=1, **options))
+        self.assertNotEqual(self.rows(seed=1, **options),
+                            self.rows(seed=2, **options))
+        self.assertEqual(Dataset(until=until).until, until)
+
+    def test_default_until_is_fixed(self):
+        self.assertEqual(Dataset().until, UNTIL)
+
+    def test_parse_until(self):
+        self.assertEqual(parse_until('2023-06-01'),
+                         datetime(2023, 6, 1, tzinfo=timezone.utc))
+        self.assertEqual(parse_until('2023-06-01T12:30:00+03:00'),
+                         datetime(2023, 6, 1, 9, 30, tzinfo=timezone.utc))
+        with self.assertRaises(ValueError):
+            parse_until('вчера')
+
+    def test_seed_command(self):
+        call_command(
+            'seed_yatube', users=30, groups=3, posts=200, comments=50,
+            follows=3, celebrities=2, reach=1.0, password='secret',
+            until=parse_until('2023-06-01'), batch_size=7, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        celebrity = User.objects.order_by('pk').first()
+        self.assertEqual(
+            Follow.objects.filter(author=celebrity).count(), 29
+        )
+        self.assertTrue(
+            self.client.login(username=celebrity.username,
+                              password='secret')
+        )
+        stats = UserStats.objects.get(user=celebrity)
+        self.assertEqual(stats.posts_count, celebrity.posts.count())
+        self.assertEqual(stats.followers_count, 29)
+        self.assertTrue(TimelineEntry.objects.exists())
+        post = Post.objects.order_by('pk').last()
+        found, _ = search.search(post.text.split()[0])
+        self.assertTrue(found)
+        self.assertEqual(
+            Post.objects.order_by('-pub_date').first(), post
+        )
+        self.assertLess(post.pub_date, parse_until('2023-06-01'))
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from .. import sitemaps
+from ..models import Group, Post, User
+
+NS = {'s': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+
+
+class SitemapsTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(SITEMAP_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.author = User.objects.create_user(username='author')
+        Group.objects.create(
+            title='Test group', slug='test-slug', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(author=self.author, text=f'Post {number}')
+            for number in range(5)
+        ]
+        self.shard_size = self.posts[0].pk + 2
+
+    def build(self):
+        return sitemaps.build('http://testserver/', self.root, self.shard_size)
+
+    def locations(self, name):
+        tree = ElementTree.parse(os.path.join(self.root, name))
+        return [loc.text for loc in tree.iterfind('.//s:loc', NS)]
+
+    def test_build_writes_shards_and_index(self):
+        self.build()
+        shards = self.locations(sitemaps.INDEX_NAME)
+        posts = [
+            url for shard in shards
+            for url in self.locations(shard.rsplit('/', 1)[1])
+            if '/posts/' in url
+        ]
+        self.assertEqual(len(posts), len(self.posts))
+        self.assertIn(
+            'http://testserver/group/test-slug/',
+            self.locations(sitemaps.shard_name('groups', 0)),
+        )
+        self.assertIn(
+            'http://testserver/profile/author/',
+            self.locations(sitemaps.shard_name('profiles', 0)),
+        )
+
+    def test_rebuild_rewrites_only_changed_shards(self):
+        first = self.build()
+        self.assertEqual(self.build()['written'], 0)
+        self.posts[-1].delete()
+        stats = self.build()
+        self.assertEqual(stats['written'], 1)
+        self.assertEqual(stats['unchanged'], first['written'] - 1)
+
+    def test_sitemap_served_without_queries(self):
+        self.build()
+        with self.assertNumQueries(0):
+            response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        shard = self.locations(sitemaps.INDEX_NAME)[0]
+        with self.assertNumQueries(0):
+            response = self.client.get(shard.replace('http://testserver', ''))
+        self.assertEqual(response.status_code, 200)
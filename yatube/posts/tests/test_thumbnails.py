@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+
+from core import jobs
+from core.models import Job
+from core.testing import on_commit_callbacks
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+IMAGE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            text='Test text',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name='small.gif', content=IMAGE, content_type='image/gif'
+            ),
+        )
+        self.client = Client()
+
+    def test_card_falls_back_to_original_while_pending(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+
+    def test_card_uses_thumbnail_when_ready(self):
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.find(self.post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_generate_refreshes_post_card(self):
+        updated = self.post.updated
+        thumbnails.generate(self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, updated)
+
+    def test_backfill_command(self):
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        self.assertIsNotNone(thumbnails.find(self.post.image, 'card'))
+
+    def test_queue_mode_enqueues_job(self):
+        with self.settings(THUMBNAIL_QUEUE=True):
+            thumbnails.schedule(self.post.image.name)
+        job = Job.objects.get(name=thumbnails.generate.job_name)
+        self.assertIsNone(thumbnails.find(self.post.image, 'card'))
+        jobs.run(jobs.claim('test'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNotNone(thumbnails.find(self.post.image, 'card'))
+
+    def test_find_matches_sorl_names(self):
+        name = self.post.image.name
+        for size, (geometry, options) in thumbnails.GEOMETRIES.items():
+            with self.subTest(size=size):
+                expected = get_thumbnail(name, geometry, **options)
+                self.assertEqual(thumbnails.find(name, size).name,
+                                 expected.name)
+
+    def test_queue_mode_enqueues_image_once(self):
+        with self.settings(THUMBNAIL_QUEUE=True):
+            for _ in range(3):
+                thumbnails.schedule(self.post.image.name)
+        self.assertEqual(
+            Job.objects.filter(name=thumbnails.generate.job_name).count(), 1
+        )
+
+    def test_failed_generation_is_retried_by_queue(self):
+        with self.settings(THUMBNAIL_QUEUE=True):
+            thumbnails.schedule(self.post.image.name)
+        with mock.patch('posts.thumbnails.get_thumbnail',
+                        side_effect=OSError('disk full')), \
+                self.assertLogs('core.jobs', 'ERROR'):
+            job = jobs.run(jobs.claim('test'))
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('disk full', job.error)
+
+    def test_warm_lookup_skips_cache_and_database(self):
+        thumbnails.generate(self.post.image.name)
+        cache.clear()
+        hits = default.kvstore.stats()['hits']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNotNone(thumbnails.find(self.post.image, 'card'))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(default.kvstore.stats()['hits'], hits + 1)
+
+    def test_image_change_invalidates_store(self):
+        old_image = self.post.image.name
+        thumbnails.generate(old_image)
+        self.assertIsNotNone(thumbnails.find(old_image, 'card'))
+        self.post.image = SimpleUploadedFile(
+            name='other.gif', content=IMAGE, content_type='image/gif'
+        )
+        with on_commit_callbacks() as callbacks:
+            self.post.save()
+            self.assertIsNotNone(thumbnails.find(old_image, 'card'))
+        self.assertTrue(callbacks)
+        self.assertIsNone(thumbnails.find(old_image, 'card'))
@@ -6,10 +6,15 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Group, Post
+from core.testing import assert_url_budget, on_commit_callbacks
+
+from ..models import Comment, Follow, Group, Post
+from ..paginator import CursorPaginator, Uncounted, pack
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -251,6 +256,7 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context['page_obj']), expected)
 
     def test_second_page_contains_three_records(self):
+        cache.clear()
         second_page_posts = TESTING_ATTEMPTS % POSTS_PER_PAGE
         templates_pages_names = {
             reverse('posts:index'): second_page_posts,
@@ -262,5 +268,269 @@ class PaginatorViewsTest(TestCase):
         }
         for reverse_template, expected in templates_pages_names.items():
             with self.subTest(reverse_template=reverse_template):
-                response = self.client.get(reverse_template + '?page=2')
+                response = self.client.get(reverse_template)
+                cursor = response.context['paginator'].next_cursor
+                response = self.client.get(
+                    reverse_template, {'cursor': cursor}
+                )
                 self.assertEqual(len(response.context['page_obj']), expected)
+                self.assertFalse(response.context['paginator'].has_next)
+
+    def test_previous_page_returns_first_page(self):
+        url = reverse('posts:profile',
+                      kwargs={'username': self.user.username})
+        first_page = self.client.get(url)
+        second_page = self.client.get(
+            url, {'cursor': first_page.context['paginator'].next_cursor}
+        )
+        paginator = second_page.context['paginator']
+        self.assertTrue(paginator.has_previous)
+        self.assertTrue(second_page.context['page_obj'].has_previous())
+        response = self.client.get(url, {'cursor': paginator.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']),
+                         list(first_page.context['page_obj']))
+        self.assertFalse(response.context['paginator'].has_previous)
+
+    def test_page_does_not_count_posts(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] and 'posts_post' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    def test_invalid_cursor_shows_first_page(self):
+        moment = self.post[0].pub_date.isoformat()
+        cursors = ('broken', pack([moment, 10 ** 30, 0]),
+                   pack([moment, '1', 0]), pack([moment, 1, 5]),
+                   pack([None, 1, 0]))
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                cache.clear()
+                response = self.client.get(reverse('posts:index'),
+                                           {'cursor': cursor})
+                self.assertEqual(len(response.context['page_obj']),
+                                 settings.POSTS_PER_PAGE)
+
+    def test_page_does_not_expose_count(self):
+        page = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE).page(None)
+        with self.assertNumQueries(0):
+            self.assertTrue(page.has_next())
+            self.assertFalse(page.has_previous())
+            self.assertTrue(page.has_other_pages())
+            for name in ('count', 'page_range'):
+                with self.assertRaises(Uncounted):
+                    getattr(page.paginator, name)
+
+
+class FeedQueriesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title='Test group',
+            slug='test-slug',
+            description='Test description',
+        )
+        self.reader = User.objects.create_user(username='reader')
+        for number in range(TESTING_ATTEMPTS):
+            author = User.objects.create_user(username=f'author{number}')
+            post = Post.objects.create(
+                text=f'Post {number}',
+                author=author,
+                group=self.group,
+            )
+            Follow.objects.create(user=self.reader, author=author)
+            Comment.objects.create(post=post, author=author, text='Comment')
+        self.post = post
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def test_list_pages_query_count(self):
+        # Каждая страница делает еще один запрос для ETag,
+        # профиль - два (автор со счетчиками и строки страницы).
+        pages = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}): 3,
+            reverse('posts:profile', kwargs={'username': 'author0'}): 5,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.client.get(url)
+
+    def test_follow_page_query_count(self):
+        # Сессия, пользователь, ETag и одна выборка ленты.
+        with self.assertNumQueries(4):
+            self.authorized_client.get(reverse('posts:follow_index'))
+
+    def test_post_detail_query_count(self):
+        # ETag, пост, счетчики автора и комментарии с авторами.
+        with self.assertNumQueries(4):
+            self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+            )
+
+    def test_pages_fit_query_budgets(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                assert_url_budget(self.authorized_client, url)
+
+
+class CommentsPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Test text')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text=f'Comment {n}')
+            for n in range(settings.COMMENTS_PER_PAGE + 5)
+        ])
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+
+    def test_detail_renders_first_page_inline(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(len(response.context['comments']),
+                         settings.COMMENTS_PER_PAGE)
+        self.assertTrue(response.context['comments_paginator'].has_next)
+
+    def test_fragment_for_missing_post_is_404(self):
+        response = self.client.get(
+            reverse('posts:comments', kwargs={'post_id': self.post.id + 100})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_fragment_returns_next_page(self):
+        response = self.client.get(self.detail_url)
+        cursor = response.context['comments_paginator'].next_cursor
+        fragment = self.client.get(
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+            {'cursor': cursor},
+        )
+        self.assertTemplateUsed(fragment, 'posts/includes/comment_list.html')
+        self.assertEqual(len(fragment.context['comments']), 5)
+        self.assertFalse(fragment.context['comments_paginator'].has_next)
+        shown = {comment.id for comment in response.context['comments']}
+        self.assertFalse(shown & {
+            comment.id for comment in fragment.context['comments']
+        })
+
+    def test_detail_cost_does_not_grow_with_comments(self):
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.detail_url)
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='More')
+        ] * 100)
+        with self.assertNumQueries(len(before)):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(len(response.context['comments']),
+                         settings.COMMENTS_PER_PAGE)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Test group', slug='test-slug', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Test text'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+
+    def revalidate(self, url, client=None):
+        client = client or self.authorized_client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_304(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+    def test_etag_differs_between_users(self):
+        url = reverse('posts:index')
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_again_changes_etag(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.authorized_client.get(url)['ETag']
+        self.authorized_client.logout()
+        self.authorized_client.force_login(self.reader)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_changes_invalidate_etag(self):
+        changes = {
+            self.urls[0]: lambda: Post.objects.create(
+                author=self.author, text='New post'
+            ),
+            self.urls[1]: lambda: Group.objects.filter(
+                pk=self.group.pk
+            ).first().save(),
+            self.urls[2]: lambda: Follow.objects.create(
+                user=self.author, author=self.reader
+            ),
+            self.urls[3]: lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Comment'
+            ),
+            self.urls[4]: lambda: self.post.save(),
+        }
+        for url, change in changes.items():
+            with self.subTest(url=url):
+                cache.clear()
+                etag = self.authorized_client.get(url)['ETag']
+                with on_commit_callbacks():
+                    change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_release_changes_etag(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                with self.settings(RELEASE='1.0'):
+                    etag = self.authorized_client.get(url)['ETag']
+                with self.settings(RELEASE='1.1'):
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_edit_invalidates_post_detail(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Comment'
+        )
+        url = self.urls[3]
+        etag = self.client.get(url)['ETag']
+        comment.text = 'Edited'
+        comment.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,125 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.jobs import job
+
+from .cache import bump_feed_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+GEOMETRIES = settings.THUMBNAIL_GEOMETRIES
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def find(image, size):
+    """Готовая миниатюра из хранилища sorl или None, без генерации.
+
+    Имя миниатюры строится так же, как в get_thumbnail, закрытыми
+    методами бэкенда sorl: версия sorl закреплена в requirements.txt,
+    а совпадение имен проверяет тест.
+    """
+    geometry, options = GEOMETRIES[size]
+    options = dict(options)
+    backend = default.backend
+    source = ImageFile(image)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def forget(name):
+    """Удаляет из хранилища sorl картинку name и ее миниатюры."""
+    if name and not Post.objects.filter(image=name).exists():
+        default.kvstore.delete(ImageFile(name, default.storage))
+
+
+@job(unique=True)
+def generate(name):
+    """Создает миниатюры всех размеров для картинки name.
+
+    Ошибки не перехватываются: в очереди задач их ловит обработчик и
+    повторяет задачу, в пуле процесса - try_generate.
+    """
+    for geometry, options in GEOMETRIES.values():
+        get_thumbnail(name, geometry, **options)
+    if any(find(name, size) is None for size in GEOMETRIES):
+        return
+    # Карточки постов закэшированы с запасной картинкой: обновляем
+    # отметку изменения, чтобы они перерисовались с миниатюрой.
+    Post.objects.filter(image=name).update(updated=timezone.now())
+    transaction.on_commit(bump_feed_version)
+
+
+def try_generate(name):
+    """generate, записывающая ошибку в лог; True при успехе."""
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+        return False
+    return True
+
+
+def _run_in_pool(name):
+    try:
+        try_generate(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        connection.close()
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр в очередь задач или в пул процесса.
+
+    Повторные вызовы для картинки, которая уже ждет генерации, ничего
+    не добавляют: так промахи кэша карточек на GET не плодят задачи.
+    """
+    if not name:
+        return
+    if settings.THUMBNAIL_QUEUE:
+        generate.delay(name)
+    else:
+        transaction.on_commit(lambda: _submit(name))
+
+
+def _submit(name):
+    global _executor
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if not settings.THUMBNAIL_WORKERS:
+        try:
+            try_generate(name)
+        finally:
+            with _lock:
+                _pending.discard(name)
+        return
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    _executor.submit(_run_in_pool, name)
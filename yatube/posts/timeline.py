@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+
+from core.jobs import job
+
+from .models import Follow, Post, TimelineEntry
+
+TIMELINE_LENGTH = settings.TIMELINE_LENGTH
+BATCH_SIZE = 500
+
+
+# Одним запросом удаляет записи сверх length, но только в лентах, где
+# их больше length: остальные ленты не сканируются.
+TRIM_SQL = """
+DELETE FROM {table} WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC
+        ) AS position
+        FROM {table}
+        WHERE user_id IN (
+            SELECT user_id FROM {table}
+            WHERE user_id IN ({users})
+            GROUP BY user_id HAVING COUNT(*) > %s
+        )
+    ) WHERE position > %s
+)
+"""
+
+
+def trim(user_ids, length=TIMELINE_LENGTH):
+    """Оставляет в ленте каждого пользователя не больше length записей.
+
+    user_ids - список или values_list-queryset с id пользователей.
+    """
+    if isinstance(user_ids, QuerySet):
+        _trim(*user_ids.query.sql_with_params(), length)
+        return
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        chunk = user_ids[start:start + BATCH_SIZE]
+        _trim(', '.join(['%s'] * len(chunk)), chunk, length)
+
+
+def _trim(users, params, length):
+    sql = TRIM_SQL.format(table=TimelineEntry._meta.db_table, users=users)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, length, length])
+
+
+@job(unique=True)
+def trim_followers(author_id, length=TIMELINE_LENGTH):
+    """Обрезает ленты подписчиков автора; задача ставится из fan_out."""
+    trim(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True), length)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    На пути записи только вставка: ленты обрезаются задачей
+    trim_followers (и rebuild_timelines --trim-only), а не в транзакции
+    создания поста.
+    """
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    added = 0
+    for user_id in followers.iterator():
+        batch.append(TimelineEntry(
+            user_id=user_id, post=post, pub_date=post.pub_date
+        ))
+        added += 1
+        if len(batch) == BATCH_SIZE:
+            _flush(batch)
+            batch = []
+    _flush(batch)
+    if added:
+        trim_followers.delay(post.author_id)
+
+
+def backfill(user_id, author_id, length=TIMELINE_LENGTH):
+    """Добавляет в ленту подписчика последние посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')[:length]
+    _flush([
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    ])
+    trim([user_id], length)
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id, length=TIMELINE_LENGTH):
+    """Пересобирает ленту пользователя по его подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author__following__user_id=user_id
+    ).values_list('id', 'pub_date')[:length]
+    _flush([
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    ])
+
+
+def _flush(entries):
+    if entries:
+        TimelineEntry.objects.bulk_create(
+            entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
@@ -1,6 +1,6 @@
-from django.urls import path
+from django.urls import path, re_path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 
@@ -12,6 +12,44 @@ urlpatterns = [
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.post_search, name='search'),
+    path('sitemap.xml', views.sitemap, name='sitemap'),
+    re_path(
+        r'^sitemaps/(?P<name>sitemap-[\w-]+\.xml)$',
+        views.sitemap,
+        name='sitemap_shard'
+    ),
+    path('rss/', feeds.serve(feeds.LatestPostsFeed), name='feed_rss'),
+    path(
+        'atom/',
+        feeds.serve(feeds.LatestPostsAtomFeed),
+        name='feed_atom'
+    ),
+    path(
+        'group/<slug:slug>/rss/',
+        feeds.serve(feeds.GroupPostsFeed),
+        name='group_feed_rss'
+    ),
+    path(
+        'group/<slug:slug>/atom/',
+        feeds.serve(feeds.GroupPostsAtomFeed),
+        name='group_feed_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.serve(feeds.AuthorPostsFeed),
+        name='profile_feed_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.serve(feeds.AuthorPostsAtomFeed),
+        name='profile_feed_atom'
+    ),
+    path(
+        'profile/<str:username>/export/',
+        views.profile_export,
+        name='profile_export'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -22,5 +60,14 @@ urlpatterns = [
         views.profile_unfollow,
         name="profile_unfollow"
     ),
-    path('posts/<int:post_id>/comment/', views.add_comment, name='add_comment')
+    path(
+        'posts/<int:post_id>/comment/',
+        views.add_comment,
+        name='add_comment'
+    ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='comments'
+    ),
 ]
@@ -1,76 +1,132 @@
+from operator import attrgetter
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+from django.views.static import serve
+
+from core.sqlite import retry_locked
 
+from . import counters, etags, exporter, search, sitemaps, thumbnails
+from .cache import cache_feed, get_feed_version
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .paginator import CursorPaginator
 
 CACHE = settings.CACHING_TIME
 POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+COMMENTS_PER_PAGE = settings.COMMENTS_PER_PAGE
+EXPORT_TYPES = {'jsonl': 'application/jsonl', 'csv': 'text/csv'}
 
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def get_page_context(queryset, request, **kwargs):
+    paginator = CursorPaginator(queryset, POSTS_PER_PAGE, **kwargs)
+    cursor = request.GET.get('cursor')
+    page_obj = paginator.get_page(cursor)
     return {
         'paginator': paginator,
-        'page_number': page_number,
+        'cursor': cursor,
         'page_obj': page_obj,
     }
 
 
-@cache_page(CACHE)
+@condition(etag_func=etags.index)
+@cache_feed(CACHE)
 def index(request):
-    context = get_page_context(Post.objects.all(), request)
+    context = {
+        'feed_version': get_feed_version(),
+        'cache_time': CACHE,
+    }
+    context.update(get_page_context(Post.objects.for_feed(), request))
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=etags.group_posts)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     context = {
         'group': group,
         'posts': posts,
     }
-    context.update(get_page_context(group.posts.all(), request))
+    context.update(get_page_context(posts, request))
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=etags.profile)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_count = Post.objects.select_related('author').count()
+    stats = counters.for_user(author)
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author
     ).exists()
     context = {
         'author': author,
-        'post_count': post_count,
+        'stats': stats,
+        'post_count': stats.posts_count,
         'following': following,
     }
-    context.update(get_page_context(author.posts.all(), request))
+    context.update(get_page_context(author.posts.for_feed(), request))
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=etags.post_detail)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.select_related('author').count()
-    author = post.author
-    post_count = author.posts.count()
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    post_count = counters.for_user(post.author).posts_count
     form = CommentForm(request.POST or None)
-    comment = Comment.objects.filter(post_id=post.id)
     context = {
         'post': post,
         'post_count': post_count,
-        'comments': comment,
         'form': form,
     }
+    context.update(get_comments_context(post.id, None))
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_context(post_id, cursor):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).for_thread(),
+        COMMENTS_PER_PAGE,
+        ordering=('created', 'id'),
+    )
+    return {
+        'post_id': post_id,
+        'comments': paginator.get_page(cursor),
+        'comments_paginator': paginator,
+    }
+
+
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('id'), pk=post_id)
+    context = get_comments_context(post_id, request.GET.get('cursor'))
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def sitemap(request, name=sitemaps.INDEX_NAME):
+    """Готовый файл карты сайта; база не используется."""
+    return serve(request, name, document_root=settings.SITEMAP_ROOT)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
+    posts, next_cursor = search.search(query, cursor, POSTS_PER_PAGE)
+    context = {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'is_next_page': bool(cursor),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@retry_locked
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(
@@ -80,6 +136,7 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        thumbnails.schedule(new_post.image.name)
         return redirect('posts:profile', new_post.author)
     context = {
         'form': form,
@@ -89,16 +146,47 @@ def post_create(request):
 
 
 @login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        return redirect('posts:profile', username=username)
+    fmt = request.GET.get('format')
+    if fmt not in EXPORT_TYPES:
+        fmt = 'jsonl'
+    if request.GET.get('zip'):
+        response = StreamingHttpResponse(
+            exporter.stream_zip(author, fmt),
+            content_type='application/zip',
+        )
+        filename = f'{username}.zip'
+    else:
+        kind = request.GET.get('what')
+        if kind not in exporter.RECORDS:
+            kind = 'posts'
+        response = StreamingHttpResponse(
+            exporter.render(kind, author, fmt),
+            content_type=f'{EXPORT_TYPES[fmt]}; charset=utf-8',
+        )
+        filename = f'{username}-{kind}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@retry_locked
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post)
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image.name)
         return redirect('posts:post_detail',
                         post_id=post.id)
     context = {
@@ -110,8 +198,10 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_locked
+@transaction.atomic
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -122,14 +212,23 @@ def add_comment(request, post_id):
 
 
 @login_required
+@condition(etag_func=etags.follow_index)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    entries = TimelineEntry.objects.filter(
+        user=request.user
+    ).select_related('post__author', 'post__group')
     context = {}
-    context.update(get_page_context(post_list.all(), request))
+    context.update(get_page_context(
+        entries, request,
+        ordering=('pub_date', 'post_id'),
+        item=attrgetter('post'),
+    ))
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@retry_locked
+@transaction.atomic
 def profile_follow(request, username):
     user = get_object_or_404(User, username=username)
     if request.user != user:
@@ -141,6 +240,8 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_locked
+@transaction.atomic
 def profile_unfollow(request, username):
     user = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=user).delete()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfileMiddleware',
+    'core.middleware.TemplateTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +57,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -62,14 +67,128 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+TESTING = 'test' in sys.argv[1:2] or 'pytest' in sys.modules
+
+# Версии ленты, пользователей и групп (posts.cache) должны быть общими
+# для всех процессов сервера: иначе смена версии в одном воркере не
+# доходит до остальных, и они часами отдают старые страницы. Сами
+# страницы и карточки лежат в кэше процесса под этими версиями.
+VERSIONS_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'versions')
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': VERSIONS_CACHE_DIR,
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+if TESTING:
+    # Тесты идут в одном процессе и не должны оставлять файлов.
+    CACHES['versions'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'versions',
     }
+
+CACHING_TIME = 60 * 60 * 4
+
+# Метка выпуска, входящая в каждый ETag: после выкладки с новыми
+# шаблонами клиенты не получат 304 со старой разметкой. Без переменной
+# окружения берется отпечаток файлов шаблонов (posts.etags.release).
+RELEASE = os.environ.get('YATUBE_RELEASE', '')
+
+POST_CARD_CACHE_TIME = 60 * 60 * 24
+
+# RSS/Atom: сколько постов в ленте и сколько сервер держит ее в кэше;
+# клиенты каждый раз перепроверяют ленту по ETag.
+FEED_ITEMS = 20
+FEED_CACHE_TIME = 60 * 15
+
+# Размеры миниатюр, которые создаются сразу после загрузки картинки.
+THUMBNAIL_GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# В тестах миниатюры создаются синхронно, без пула потоков.
+THUMBNAIL_WORKERS = 0 if TESTING else 4
+THUMBNAIL_KVSTORE = 'posts.kvstore.LRUKVStore'
+THUMBNAIL_LRU_SIZE = 10000
+# True: миниатюры создает run_workers через очередь задач, а не пул
+# потоков процесса, принявшего картинку.
+THUMBNAIL_QUEUE = False
+
+# Сколько SQL-запросов может выполнить вьюха; в тестах превышение
+# бюджета поднимает исключение, на проде только пишется в лог.
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_posts': 6,
+    'posts:profile': 9,
+    'posts:post_detail': 7,
+    'posts:follow_index': 5,
+    'posts:search': 4,
+    'posts:comments': 3,
+}
+QUERY_BUDGET_RAISE = TESTING
+QUERY_DUPLICATES_THRESHOLD = 5
+# Хранилище sorl-thumbnail заполняется при первом рендере картинки.
+QUERY_BUDGET_IGNORE_TABLES = ('thumbnail_kvstore',)
+
+# Бенчмарк вьюх (manage.py bench_views): базовые замеры, допустимый
+# рост p95 и URL, которые меняют данные или выгружают все посты.
+BENCH_BASELINE = os.path.join(BASE_DIR, 'bench_views.json')
+BENCH_THRESHOLD = 0.2
+BENCH_SKIP_URLS = {
+    'users:logout',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+    'posts:add_comment',
+    'posts:profile_export',
 }
 
-CACHING_TIME = 20
+# Профилирование запросов (core.middleware.ProfileMiddleware): доля
+# случайных запросов и заголовок, которым токен из manage.py
+# profile_token включает профиль запроса. Статистика копится по вьюхам
+# в окнах PROFILE_WINDOW секунд, хранятся последние PROFILE_KEEP окон;
+# на странице для персонала видно PROFILE_TOP функций.
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_TOKEN_MAX_AGE = 24 * 3600
+PROFILE_ROOT = os.path.join(BASE_DIR, 'profiles')
+PROFILE_WINDOW = 3600
+PROFILE_KEEP = 24
+PROFILE_TOP = 40
+
+# Замеры рендеринга шаблонов, include, тегов и фильтров
+# (core.templating, core.middleware.TemplateTimingMiddleware): итог
+# запроса пишется в лог core.templates, а TEMPLATE_TIMING_TOP самых
+# дорогих записей - в заголовок Server-Timing. Заголовок раскрывает
+# имена шаблонов, поэтому всем он отдается только при DEBUG, а иначе
+# только персоналу.
+TEMPLATE_TIMING = True
+TEMPLATE_TIMING_HEADER = DEBUG
+TEMPLATE_TIMING_TOP = 10
+
+TIMELINE_LENGTH = 1000
+
+# Очередь задач в базе (core.jobs, manage.py run_workers).
+JOB_WORKERS = 4
+# Первый повтор упавшей задачи через столько секунд, дальше вдвое дольше.
+JOB_RETRY_DELAY = 30
+# Задача, которая выполняется дольше, считается брошенной.
+JOB_STALE_AFTER = 60 * 30
+
+# Сколько строк выгрузка читает из базы за один раз.
+EXPORT_CHUNK_SIZE = 2000
+
+# Карта сайта собирается командой build_sitemaps в статические файлы;
+# на проде их лучше отдавать веб-сервером напрямую.
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_SHARD_SIZE = 50000
+SITEMAP_BASE_URL = 'http://localhost:8000'
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -79,6 +198,13 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Дайджесты новых постов (manage.py send_digests): сколько писем
+# отправлять за раз, сколько постов показывать в письме и за какой
+# период собирать первый дайджест подписчика (в секундах).
+DIGEST_BATCH_SIZE = 100
+DIGEST_MAX_POSTS = 20
+DIGEST_FIRST_WINDOW = 60 * 60 * 24
+
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -105,12 +231,59 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+REPLICA_PATH = os.path.join(BASE_DIR, 'db.replica.sqlite3')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 60,
+    },
+    # Копия основной базы, которую обновляет manage.py refresh_replica.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_PATH,
+        'CONN_MAX_AGE': 60,
+    },
+}
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Реплики для чтения. Копия включается, когда она уже создана;
+# в тестах реплик нет: тестовая база живет только в памяти.
+DATABASE_REPLICAS = (
+    ['replica'] if os.path.exists(REPLICA_PATH) and not TESTING else []
+)
+# Вьюхи, которые читают с реплик, и сколько секунд после изменения
+# данных пользователь читает только с основной базы.
+REPLICA_VIEWS = {
+    'posts:index',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:search',
+    'posts:comments',
+}
+# Вьюхи, которые меняют данные и на GET: после них сессия тоже
+# закрепляется за основной базой.
+REPLICA_WRITE_VIEWS = {
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+}
+REPLICA_PIN_SECONDS = 10
+# Прагмы для каждого нового соединения с SQLite: WAL пускает читателей
+# параллельно с писателем, synchronous=normal в WAL не теряет
+# целостность, busy_timeout (мс) ждет блокировку вместо ошибки,
+# cache_size (отрицательный - в КиБ) и mmap_size (байты) - память.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
 }
+# Повторы записи, упавшей на блокировке базы, и базовая пауза, с.
+SQLITE_RETRY_ATTEMPTS = 5
+SQLITE_RETRY_DELAY = 0.05
 
 
 # Password validation
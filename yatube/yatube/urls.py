@@ -25,6 +25,7 @@ handler403 = 'core.views.permission_denied'
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path('admin/', include('core.urls', namespace='core')),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),